@@ -0,0 +1,321 @@
+import json
+from datetime import date
+from itertools import count
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from form.models import (
+    ExamDetail,
+    PersonalDetails,
+    RootForm,
+    ServiceDetails,
+    refresh_search_documents,
+)
+from services.benchmark import (
+    MIN_LATENCY_SAMPLES,
+    check_budgets,
+    format_summary,
+    load_budgets,
+    summarize,
+)
+from services.counts import bump_table_generation
+from user.enums import UserRoleEnum
+from user.models import CustomUser
+
+DEFAULT_BUDGETS = Path(settings.BASE_DIR) / "services" / "benchmark_budgets.json"
+PASSWORD = "Bench@123"
+# Keeps sub-10ms endpoints from failing on timer noise
+MIN_LATENCY_BUDGET_MS = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and time the main form and user "
+        "endpoints through the test client. Reports p50/p95 latency and SQL "
+        "queries per endpoint and fails when one goes over its query budget, "
+        f"or its p95 budget with at least {MIN_LATENCY_SAMPLES} iterations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--forms", type=int, default=1000)
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=30,
+            help=(
+                f"p95 budgets are only enforced from {MIN_LATENCY_SAMPLES} "
+                "iterations; fewer report them as advisory."
+            ),
+        )
+        parser.add_argument(
+            "--login-iterations",
+            type=int,
+            default=5,
+            help="Logins are dominated by password hashing, so fewer are timed.",
+        )
+        parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS))
+        parser.add_argument(
+            "--write-budgets",
+            action="store_true",
+            help=(
+                "Store this run's query counts and twice its p95 (at least "
+                f"{MIN_LATENCY_BUDGET_MS}ms) as the new budgets."
+            ),
+        )
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            results = self.run(**options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for label, result in results.items():
+                self.stdout.write(
+                    f"{format_summary(label, result)} queries={result['queries']}"
+                )
+
+        if options["write_budgets"]:
+            budgets = {
+                label: {
+                    "queries": result["queries"],
+                    "p95_ms": max(ceil(result["p95_ms"] * 2), MIN_LATENCY_BUDGET_MS),
+                }
+                for label, result in results.items()
+            }
+            with open(options["budgets"], "w", encoding="utf-8") as stream:
+                json.dump(budgets, stream, indent=2)
+                stream.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Budgets written to {options['budgets']}"))
+            return
+
+        failures, warnings = check_budgets(results, load_budgets(options["budgets"]))
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f"Advisory, too few samples: {warning}"))
+        if failures:
+            raise CommandError("Over budget:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("All endpoints within budget"))
+
+    def seed(self, users, forms):
+        password = make_password(PASSWORD)
+        admin = CustomUser(
+            email="admin@bench.local",
+            first_name="Bench",
+            last_name="Admin",
+            password=password,
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        employees = [
+            CustomUser(
+                email=f"employee{i}@bench.local",
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+                phone_number=f"9{i:09d}",
+                password=password,
+                user_role=UserRoleEnum.USER.value,
+            )
+            for i in range(users)
+        ]
+        for user in [admin, *employees]:
+            user.search_document = user.build_search_document()
+        CustomUser.objects.bulk_create([admin, *employees])
+
+        root_forms = [
+            RootForm(
+                user=employees[i % users],
+                created_by=employees[i % users],
+                form_number=f"BENCH-{i}",
+                status=RootForm.Status.COMPLETED,
+                current_step=2,
+                step_completed=[1, 2],
+            )
+            for i in range(forms)
+        ]
+        RootForm.objects.bulk_create(root_forms)
+        PersonalDetails.objects.bulk_create(
+            [
+                PersonalDetails(
+                    root_form=root_form,
+                    email=root_form.user.email,
+                    first_name=root_form.user.first_name,
+                    middle_name="Middle",
+                    last_name=root_form.user.last_name,
+                    gender=PersonalDetails.Gender.OTHER,
+                    mobile_number=root_form.user.phone_number,
+                    pan_number=f"ABCDE{i:04d}F"[:10],
+                    is_step_completed=True,
+                )
+                for i, root_form in enumerate(root_forms)
+            ]
+        )
+        service_details = ServiceDetails.objects.bulk_create(
+            [
+                ServiceDetails(
+                    root_form=root_form,
+                    joining_appointment_date=date(2015, 6, 1),
+                    post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+                    is_step_completed=True,
+                )
+                for root_form in root_forms
+            ]
+        )
+        ExamDetail.objects.bulk_create(
+            [
+                ExamDetail(service_details=details, exam_type=exam_type)
+                for details in service_details
+                for exam_type in ("pre_service", "ccc")
+            ]
+        )
+        # bulk_create skips the signals that maintain these
+        refresh_search_documents(RootForm.all_objects.all())
+        bump_table_generation(RootForm._meta.db_table, CustomUser._meta.db_table)
+        return admin, root_forms
+
+    def run(self, users, forms, iterations, login_iterations, **options):
+        if users < 1 or forms < 1:
+            raise CommandError("--users and --forms must be at least 1.")
+        admin, root_forms = self.seed(users, forms)
+
+        client = Client()
+        credentials = {"email": admin.email, "password": PASSWORD}
+        response = client.post(
+            reverse("user:users-user-login"), credentials, content_type="application/json"
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Login failed: {response.json()}")
+        headers = {"Authorization": f"Bearer {response.json()['data']['access']}"}
+
+        # Fresh forms for the create step, so every request inserts a row
+        new_forms = RootForm.objects.bulk_create(
+            [
+                RootForm(user=admin, created_by=admin, form_number=f"BENCH-NEW-{i}")
+                for i in range(iterations + 1)
+            ]
+        )
+        new_form_ids = iter(new_forms)
+        sequence = count()
+        target = root_forms[0]
+
+        def personal_details_payload():
+            return {
+                "root_form_id": str(next(new_form_ids).pk),
+                "email": "new@bench.local",
+                "first_name": "New",
+                "middle_name": "Bench",
+                "last_name": f"Employee{next(sequence)}",
+                "gender": PersonalDetails.Gender.OTHER,
+                "mobile_number": "9999999999",
+                "pan_number": "ABCDE1234F",
+                "is_step_completed": True,
+            }
+
+        endpoints = {
+            "login": (
+                login_iterations,
+                lambda: client.post(
+                    reverse("user:users-user-login"),
+                    credentials,
+                    content_type="application/json",
+                ),
+            ),
+            "me": (
+                iterations,
+                lambda: client.get(reverse("user:users-me"), headers=headers),
+            ),
+            "list users": (
+                iterations,
+                lambda: client.get(reverse("user:users-users"), headers=headers),
+            ),
+            "list forms with search": (
+                iterations,
+                lambda: client.get(
+                    reverse("form:root-form-list"), {"search": "first1"}, headers=headers
+                ),
+            ),
+            "list users (100 rows)": (
+                iterations,
+                lambda: client.get(
+                    reverse("user:users-users"), {"page_size": 100}, headers=headers
+                ),
+            ),
+            "list forms (100 rows)": (
+                iterations,
+                lambda: client.get(
+                    reverse("form:root-form-list"), {"page_size": 100}, headers=headers
+                ),
+            ),
+            "retrieve form": (
+                iterations,
+                lambda: client.get(
+                    reverse("form:root-form-detail", args=[target.pk]), headers=headers
+                ),
+            ),
+            "create personal details": (
+                iterations,
+                lambda: client.post(
+                    reverse("form:personal-details-list"),
+                    personal_details_payload(),
+                    content_type="application/json",
+                    headers=headers,
+                ),
+            ),
+            "update service details": (
+                iterations,
+                lambda: client.patch(
+                    reverse(
+                        "form:service-details-detail",
+                        args=[target.service_details.pk],
+                    ),
+                    {
+                        "ppan": f"PPAN{next(sequence)}",
+                        "exams": [{"exam_type": "ccc"}, {"exam_type": "lrq"}],
+                    },
+                    content_type="application/json",
+                    headers=headers,
+                ),
+            ),
+        }
+
+        results = {}
+        for label, (runs, request) in endpoints.items():
+            # One untimed request warms caches and lazy imports
+            self.send(label, request)
+            timings, queries = [], 0
+            for _ in range(runs):
+                with CaptureQueriesContext(connection) as context:
+                    start = perf_counter()
+                    self.send(label, request)
+                    timings.append(perf_counter() - start)
+                queries = max(queries, len(context.captured_queries))
+            results[label] = {**summarize(timings), "queries": queries}
+        return results
+
+    def send(self, label, request):
+        response = request()
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{label} failed with {response.status_code}: {response.content[:500]!r}"
+            )
+        return response
@@ -1,6 +1,7 @@
 import os
 import environ
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 from django.core.management.utils import get_random_secret_key
 
@@ -34,6 +35,7 @@ DJANGO_APPS = [
 ]
 
 PROJECT_APPS = [
+    "EMS",
     "user",
     "form",
 ]
@@ -51,6 +53,8 @@ INSTALLED_APPS = DJANGO_APPS + PROJECT_APPS + PACKAGES
 # ==============================================================================
 
 MIDDLEWARE = [
+    "services.middleware.PerformanceMiddleware",
+    "services.nplusone.NPlusOneMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -109,6 +113,16 @@ DATABASES = {
     }
 }
 
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+# List count generations, the authentication user cache and /me payloads are
+# invalidated through this cache, so every worker must share it, e.g.
+# CACHE_URL=redis://localhost:6379/1. The default local-memory cache is only
+# right for a single process; ``check --deploy`` warns about it.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # ==============================================================================
 # AUTHENTICATION
 # ==============================================================================
@@ -139,10 +153,28 @@ REST_FRAMEWORK = {
         "user.authentication.CustomUserIsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.ClaimsJWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": [
+        "services.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "services.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# application/msgpack is offered only where the optional msgpack is installed
+if find_spec("msgpack") is not None:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(
+        1, "services.renderers.MessagePackRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(
+        1, "services.renderers.MessagePackParser"
+    )
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=20),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=20),
@@ -152,7 +184,7 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
-    "USER_AUTHENTICATION_RULE": "user_auth.models.CustomUser.is_active",
+    "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "VERIFYING_KEY": None,
@@ -160,11 +192,32 @@ SIMPLE_JWT = {
     "ISSUER": None,
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
-    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_USER_CLASS": "user.authentication.ClaimsUser",
     "JTI_CLAIM": "jti",
     "USER_ID_FIELD": "id",
 }
 
+# Seconds between incremental reloads of revoked access tokens on each worker,
+# i.e. the longest a logout takes to reach every other worker.
+TOKEN_REVOCATION_REFRESH_INTERVAL = env.int(
+    "TOKEN_REVOCATION_REFRESH_INTERVAL", default=5
+)
+# Seconds a CustomUser row stays in the authentication cache; saves clear it.
+USER_CACHE_TIMEOUT = env.int("USER_CACHE_TIMEOUT", default=300)
+# Cache alias and lifetime of rendered /me payloads. Profile saves, update_profile
+# and new forms by the user invalidate them. Payloads are not cached while the
+# alias names a cache local to each process.
+PROFILE_CACHE_ALIAS = env("PROFILE_CACHE_ALIAS", default="default")
+PROFILE_CACHE_TIMEOUT = env.int("PROFILE_CACHE_TIMEOUT", default=300)
+# Password hashes the async login verifies at once per worker, and how long a
+# login waits for a free slot before getting a 503.
+LOGIN_HASH_CONCURRENCY = env.int("LOGIN_HASH_CONCURRENCY", default=os.cpu_count() or 2)
+LOGIN_HASH_QUEUE_TIMEOUT = env.float("LOGIN_HASH_QUEUE_TIMEOUT", default=5.0)
+# Threads per worker hashing the passwords of bulk-added users.
+PROVISIONING_HASH_WORKERS = env.int(
+    "PROVISIONING_HASH_WORKERS", default=os.cpu_count() or 2
+)
+
 # ==============================================================================
 # ORIGIN
 # ==============================================================================
@@ -186,3 +239,53 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# ==============================================================================
+# METRICS
+# ==============================================================================
+
+# Bearer token required to scrape /api/metrics/; while empty nobody can.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# The Server-Timing header shows every client the request's SQL and total
+# time, and serializer timing wraps BaseSerializer.data for every serializer,
+# so both are development aids, on by default only with DEBUG.
+SERVER_TIMING_ENABLED = env.bool("SERVER_TIMING_ENABLED", default=DEBUG)
+SERIALIZER_TIMING_ENABLED = env.bool("SERIALIZER_TIMING_ENABLED", default=DEBUG)
+
+# ==============================================================================
+# N+1 DETECTION
+# ==============================================================================
+
+# Report requests that run the same query (literals aside) more than
+# NPLUSONE_THRESHOLD times. On by default with DEBUG and always in tests,
+# where NPlusOneTestRunner also makes it raise.
+NPLUSONE_ENABLED = env.bool("NPLUSONE_ENABLED", default=DEBUG)
+NPLUSONE_THRESHOLD = env.int("NPLUSONE_THRESHOLD", default=5)
+NPLUSONE_RAISE = env.bool("NPLUSONE_RAISE", default=False)
+# Regexes matched against the normalized SQL and the request label.
+NPLUSONE_ALLOWLIST = env.list("NPLUSONE_ALLOWLIST", default=[])
+
+TEST_RUNNER = "services.testrunner.NPlusOneTestRunner"
+
+# ==============================================================================
+# FORMS
+# ==============================================================================
+
+# Form numbers each worker reserves per round trip to the day's counter row.
+FORM_NUMBER_BLOCK_SIZE = env.int("FORM_NUMBER_BLOCK_SIZE", default=1)
+# Days a soft-deleted form row stays in its table before archive_soft_deleted
+# moves it to the archive.
+SOFT_DELETE_RETENTION_DAYS = env.int("SOFT_DELETE_RETENTION_DAYS", default=90)
+
+# ==============================================================================
+# PAGINATION
+# ==============================================================================
+
+# Seconds an exact list count stays cached; writes to the counted tables
+# invalidate it earlier.
+PAGINATION_COUNT_CACHE_TIMEOUT = env.int("PAGINATION_COUNT_CACHE_TIMEOUT", default=30)
+# Unfiltered lists whose planner estimate reaches this size report the
+# estimate instead of running COUNT(*) (Postgres only).
+PAGINATION_ESTIMATE_THRESHOLD = env.int(
+    "PAGINATION_ESTIMATE_THRESHOLD", default=100_000
+)
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from services.metrics import metrics_view
+
 
 URL_PREFIX = "api/"
 
@@ -10,6 +12,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path(URL_PREFIX + "user/", include("user.urls")),
     path(URL_PREFIX + "form/", include("form.urls")),
+    path(URL_PREFIX + "metrics/", metrics_view, name="metrics"),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
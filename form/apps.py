@@ -6,6 +6,8 @@ class FormConfig(AppConfig):
     name = "form"
 
     def ready(self):
-        from .signals import update_form_step_on_step_complete as _
+        from services import cache
 
-        _ = _
+        from . import signals
+
+        _ = cache, signals
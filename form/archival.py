@@ -0,0 +1,165 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+from time import sleep
+
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import CASCADE
+from django.utils.timezone import now
+
+from .models import ArchivedRecord, ExamDetail, PersonalDetails, RootForm, ServiceDetails
+
+# Parents come first so their dependents are archived along with them before
+# the dependents are looked at on their own.
+ARCHIVED_MODELS = (RootForm, PersonalDetails, ServiceDetails, ExamDetail)
+
+
+def get_retention_cutoff(days=None):
+    if days is None:
+        days = settings.SOFT_DELETE_RETENTION_DAYS
+    return now() - timedelta(days=days)
+
+
+def collect_rows(model, roots):
+    """Return ``[(model, {pk: root_pk})]`` for ``roots`` and everything that
+    cascades from them, dependents before the rows they point at."""
+    groups = []
+    for relation in model._meta.related_objects:
+        if relation.on_delete is not CASCADE:
+            continue
+        attname = relation.field.attname
+        children = {
+            pk: roots[parent_pk]
+            for pk, parent_pk in relation.related_model._base_manager.filter(
+                **{f"{attname}__in": list(roots)}
+            ).values_list("pk", attname)
+        }
+        if children:
+            groups += collect_rows(relation.related_model, children)
+    groups.append((model, roots))
+    return groups
+
+
+def serialize_rows(model, pks):
+    return serializers.serialize(
+        "python", model._base_manager.filter(pk__in=list(pks)).order_by("pk")
+    )
+
+
+def measure_rows(model, pks):
+    """Approximate heap bytes held by ``pks``; indexes are not included"""
+    connection = connections[model._base_manager.db]
+    if connection.vendor == "postgresql":
+        opts = model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(SUM(pg_column_size(t.*)), 0) FROM "
+                f"{connection.ops.quote_name(opts.db_table)} t "
+                f"WHERE {connection.ops.quote_name(opts.pk.column)} = ANY(%s)",
+                [list(pks)],
+            )
+            return cursor.fetchone()[0]
+    return sum(
+        len(json.dumps(row, cls=DjangoJSONEncoder))
+        for row in serialize_rows(model, pks)
+    )
+
+
+def archive_groups(groups, root_label):
+    records = []
+    for model, roots in groups:
+        roots_by_key = {str(pk): root_pk for pk, root_pk in roots.items()}
+        for row in serialize_rows(model, roots):
+            records.append(
+                ArchivedRecord(
+                    model_label=row["model"],
+                    object_id=str(row["pk"]),
+                    root_label=root_label,
+                    root_id=str(roots_by_key[str(row["pk"])]),
+                    data=row["fields"],
+                    deleted_at=row["fields"].get("deleted_at"),
+                )
+            )
+    ArchivedRecord.objects.bulk_create(records)
+    for model, roots in groups:
+        model._base_manager.filter(pk__in=list(roots)).delete()
+    return len(records)
+
+
+def iter_expired_batches(model, cutoff, batch_size, max_batches=None):
+    # Walk the primary key so a dry run, which leaves the rows in place,
+    # still makes progress.
+    last_pk = None
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        queryset = model._base_manager.filter(deleted_at__lt=cutoff)
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+        batches += 1
+
+
+def archive_soft_deleted(
+    cutoff, batch_size=500, max_batches=None, pause=0.0, dry_run=False
+):
+    """Move rows soft-deleted before ``cutoff`` into ``ArchivedRecord``.
+
+    Each batch of expired rows is archived with its dependents and deleted in
+    its own transaction. Returns ``{model_label: {"rows": n, "bytes": n}}``;
+    bytes are only measured on a dry run.
+    """
+    report = {}
+    # A dry run leaves rows archived with their parent in place, where their
+    # own model's batches would find and count them again.
+    counted = defaultdict(set)
+    for model in ARCHIVED_MODELS:
+        for pks in iter_expired_batches(model, cutoff, batch_size, max_batches):
+            pks = [pk for pk in pks if pk not in counted[model]]
+            if not pks:
+                continue
+            with transaction.atomic():
+                groups = collect_rows(model, {pk: pk for pk in pks})
+                if not dry_run:
+                    archive_groups(groups, model._meta.label)
+            for group_model, roots in groups:
+                entry = report.setdefault(
+                    group_model._meta.label, {"rows": 0, "bytes": 0}
+                )
+                if dry_run:
+                    roots = [pk for pk in roots if pk not in counted[group_model]]
+                    counted[group_model].update(roots)
+                    entry["bytes"] += measure_rows(group_model, roots)
+                entry["rows"] += len(roots)
+            if pause and not dry_run:
+                sleep(pause)
+    return report
+
+
+@transaction.atomic
+def restore_archived(root_label, root_id):
+    """Put an archived row and its archived dependents back in their tables.
+
+    Rows come back exactly as they were archived, ``deleted_at`` included.
+    Returns the number of rows restored.
+    """
+    records = list(
+        ArchivedRecord.objects.select_for_update()
+        .filter(root_label=root_label, root_id=str(root_id))
+        .order_by("-id")
+    )
+    rows = [
+        {"model": record.model_label, "pk": record.object_id, "fields": record.data}
+        for record in records
+    ]
+    # Archived dependents first, so restoring in reverse puts parents back first
+    for obj in serializers.deserialize("python", rows):
+        obj.save()
+    ArchivedRecord.objects.filter(pk__in=[record.pk for record in records]).delete()
+    return len(records)
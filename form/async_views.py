@@ -0,0 +1,50 @@
+from django.http import Http404
+from rest_framework import status
+from rest_framework.response import Response
+
+from services.async_api import async_api_view, get_view
+from services.conditional import check_preconditions, set_validators
+from services.pagination import CustomPagination
+from services.utils import get_response
+from user.enums import UserRoleEnum
+
+from .models import RootForm
+from .serializer import RootFormDetailSerializer, root_form_list_projection
+from .views import RootFormViewSet
+
+
+@async_api_view(allowed_roles=[UserRoleEnum.SUPER_ADMIN])
+async def root_form_list(request):
+    queryset = get_view(RootFormViewSet, request, "list").get_list_queryset()
+
+    paginator = CustomPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+
+    if page is not None:
+        return paginator.get_paginated_response(
+            root_form_list_projection.render(page),
+            message="Form list fetched successfully",
+        )
+
+    return get_response(
+        is_success=True,
+        message="Root form list fetched successfully",
+        data=root_form_list_projection.render([row async for row in queryset]),
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@async_api_view()
+async def root_form_detail(request, pk):
+    view = get_view(RootFormViewSet, request, "retrieve", pk=pk)
+    etag, last_modified = await view.aget_validators()
+    response = check_preconditions(request, etag, last_modified)
+    if response is None:
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            obj = await queryset.aget(pk=pk)
+        except RootForm.DoesNotExist:
+            raise Http404
+        serializer = RootFormDetailSerializer(obj, context=view.get_serializer_context())
+        response = Response(serializer.data)
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,174 @@
+from uuid import UUID
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from services.permissions import has_role
+from user.enums import UserRoleEnum
+
+from .exams import reconcile_exams
+from .models import RootForm, refresh_search_documents
+from .serializer import PersonalDetailsSerializer, ServiceDetailsSerializer
+from .steps import complete_steps
+
+MAX_BATCH_SIZE = 500
+STEP_SERIALIZERS = {
+    "personal_details": PersonalDetailsSerializer,
+    "service_details": ServiceDetailsSerializer,
+}
+
+
+def parse_uuid(value):
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+class StepBatch:
+    """Validates and saves many step submissions for many forms at once.
+
+    Every lookup is one query per step model, rows are written with
+    ``bulk_create``/``bulk_update`` and all affected root forms are advanced
+    together by ``complete_steps``. Items that fail validation are reported back and
+    skipped; the valid ones are saved in one transaction.
+    """
+
+    def __init__(self, items, user):
+        self.items = items
+        self.user = user
+        self.results = [None] * len(items)
+        self.entries = {step: [] for step in STEP_SERIALIZERS}
+        self.entries_by_index = {}
+
+    def fail(self, index, errors, step=None, root_form_id=None):
+        self.results[index] = {
+            "index": index,
+            "step": step,
+            "root_form_id": root_form_id,
+            "status": "error",
+            "errors": errors,
+        }
+
+    def parse(self):
+        parsed = []
+        for index, item in enumerate(self.items):
+            if not isinstance(item, dict):
+                self.fail(index, {"non_field_errors": ["Expected an object."]})
+                continue
+            step = item.get("step")
+            root_form_id = item.get("root_form_id")
+            data = item.get("data", {})
+            if step not in STEP_SERIALIZERS:
+                self.fail(index, {"step": ["Unknown step."]}, step, root_form_id)
+            elif parse_uuid(root_form_id) is None:
+                self.fail(index, {"root_form_id": ["Must be a valid UUID."]}, step, root_form_id)
+            elif not isinstance(data, dict):
+                self.fail(index, {"data": ["Expected an object."]}, step, root_form_id)
+            else:
+                parsed.append((index, step, parse_uuid(root_form_id), data))
+        return parsed
+
+    def validate(self):
+        parsed = self.parse()
+        form_ids = {root_form_id for _, _, root_form_id, _ in parsed}
+        root_forms = RootForm.objects.all()
+        if not has_role(self.user, [UserRoleEnum.SUPER_ADMIN]):
+            root_forms = root_forms.filter(user=self.user)
+        root_forms = root_forms.in_bulk(form_ids)
+        existing = {
+            step: {
+                row.root_form_id: row
+                for row in serializer_class.Meta.model.all_objects.filter(
+                    root_form_id__in=form_ids
+                )
+            }
+            for step, serializer_class in STEP_SERIALIZERS.items()
+        }
+
+        seen = set()
+        for index, step, root_form_id, data in parsed:
+            root_form = root_forms.get(root_form_id)
+            if root_form is None:
+                self.fail(index, {"root_form_id": ["Form not found."]}, step, str(root_form_id))
+                continue
+            if (step, root_form_id) in seen:
+                self.fail(
+                    index,
+                    {"non_field_errors": ["Duplicate step for this form in the batch."]},
+                    step,
+                    str(root_form_id),
+                )
+                continue
+            seen.add((step, root_form_id))
+
+            instance = existing[step].get(root_form_id)
+            data = {
+                key: value
+                for key, value in data.items()
+                if key not in ("root_form", "root_form_id")
+            }
+            serializer = STEP_SERIALIZERS[step](
+                instance,
+                data=data,
+                partial=instance is not None,
+                context={"user": self.user},
+            )
+            if not serializer.is_valid():
+                self.fail(index, serializer.errors, step, str(root_form_id))
+                continue
+            self.entries[step].append(
+                (index, root_form, instance, dict(serializer.validated_data))
+            )
+
+    def save_rows(self, step, timestamp):
+        model = STEP_SERIALIZERS[step].Meta.model
+        created, updated, updated_fields = [], [], {"updated_at", "deleted_at"}
+        exams = {}
+
+        for index, root_form, instance, data in self.entries[step]:
+            if "exams" in data:
+                exams[index] = data.pop("exams")
+            is_new = instance is None
+            if is_new:
+                instance = model(root_form=root_form, created_by=self.user, **data)
+                created.append(instance)
+            else:
+                for attr, value in data.items():
+                    setattr(instance, attr, value)
+                instance.updated_at = timestamp
+                instance.deleted_at = None
+                updated_fields.update(data)
+                updated.append(instance)
+            self.results[index] = {
+                "index": index,
+                "step": step,
+                "root_form_id": str(root_form.pk),
+                "status": "created" if is_new else "updated",
+                "id": str(instance.pk),
+            }
+            self.entries_by_index[index] = instance
+
+        model.objects.bulk_create(created)
+        model.all_objects.bulk_update(updated, sorted(updated_fields))
+        return exams
+
+    def save(self):
+        timestamp = now()
+        with transaction.atomic():
+            # Validated against the rows the batch then writes over
+            self.validate()
+            self.save_rows("personal_details", timestamp)
+            exams = self.save_rows("service_details", timestamp)
+            reconcile_exams(
+                {self.entries_by_index[index]: rows for index, rows in exams.items()},
+                timestamp,
+            )
+            complete_steps(self.entries_by_index.values(), timestamp)
+            # bulk writes skip the signal that keeps search documents current
+            refresh_search_documents(
+                RootForm.all_objects.filter(
+                    pk__in=[entry[1].pk for entry in self.entries["personal_details"]]
+                )
+            )
+        return self.results
@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from rest_framework.exceptions import ValidationError
+
+from .models import ExamDetail
+
+EXAM_FIELDS = ("passing_date", "attempt_count")
+MAX_RECONCILE_ATTEMPTS = 3
+
+
+def get_live_exams(service_details):
+    return {
+        (exam.service_details_id, exam.exam_type): exam
+        for exam in ExamDetail.objects.filter(service_details__in=service_details)
+    }
+
+
+def reconcile_exams(exams_by_service_details, timestamp=None):
+    """Bring the live exams of each service details in line with a payload.
+
+    ``exams_by_service_details`` maps saved ``ServiceDetails`` to lists of
+    validated exam dicts. Rows are matched on ``exam_type``: changed ones are
+    updated, new ones inserted and missing ones soft-deleted, with one bulk
+    statement per kind across every service details passed in.
+
+    An exam type inserted concurrently by another request violates
+    ``unique_live_exam_type``; the reconcile is then rolled back to its
+    savepoint and retried against the rows that request committed.
+    """
+    if not exams_by_service_details:
+        return
+    timestamp = timestamp or now()
+    for _ in range(MAX_RECONCILE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return apply_exams(exams_by_service_details, timestamp)
+        except IntegrityError:
+            continue
+    raise ValidationError(
+        {"exams": ["Exams were changed by another request, please retry."]}
+    )
+
+
+def apply_exams(exams_by_service_details, timestamp):
+    existing = get_live_exams(list(exams_by_service_details))
+
+    created, updated = [], []
+    for service_details, exams in exams_by_service_details.items():
+        for data in exams:
+            exam = existing.pop((service_details.pk, data["exam_type"]), None)
+            if exam is None:
+                created.append(ExamDetail(service_details=service_details, **data))
+                continue
+            changed = False
+            for field in EXAM_FIELDS:
+                if field in data and getattr(exam, field) != data[field]:
+                    setattr(exam, field, data[field])
+                    changed = True
+            if changed:
+                exam.updated_at = timestamp
+                updated.append(exam)
+
+    # Whatever is left was dropped from the payload
+    ExamDetail.objects.filter(pk__in=[exam.pk for exam in existing.values()]).update(
+        deleted_at=timestamp, updated_at=timestamp
+    )
+    ExamDetail.objects.bulk_update(updated, [*EXAM_FIELDS, "updated_at"])
+    ExamDetail.objects.bulk_create(created)
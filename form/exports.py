@@ -0,0 +1,154 @@
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils.timezone import make_aware
+
+from .models import ExamDetail, RootForm
+
+FORM_FIELDS = (
+    "id",
+    "form_number",
+    "status",
+    "current_step",
+    "user_id",
+    "created_at",
+    "completed_at",
+)
+PERSONAL_DETAILS_FIELDS = (
+    "email",
+    "first_name",
+    "middle_name",
+    "last_name",
+    "gender",
+    "mobile_number",
+    "pan_number",
+    "voter_id",
+)
+SERVICE_DETAILS_FIELDS = (
+    "joining_appointment_date",
+    "regular_appointment_date",
+    "post_at_appointment",
+    "ppan",
+    "pran",
+)
+EXAM_FIELDS = ("passing_date", "attempt_count")
+EXAM_TYPES = [exam_type for exam_type, _ in ExamDetail.EXAM_TYPES]
+
+CSV_HEADER = (
+    list(FORM_FIELDS)
+    + list(PERSONAL_DETAILS_FIELDS)
+    + list(SERVICE_DETAILS_FIELDS)
+    + [f"{exam_type}_{field}" for exam_type in EXAM_TYPES for field in EXAM_FIELDS]
+)
+
+
+def get_export_queryset(statuses=None, created_from=None, created_to=None):
+    queryset = (
+        RootForm.objects.select_related("personal_details", "service_details")
+        .prefetch_related(
+            Prefetch("service_details__exams", queryset=ExamDetail.objects.all())
+        )
+        .order_by("created_at", "id")
+    )
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    # Whole-day bounds on the raw column keep the created_at index usable.
+    if created_from:
+        queryset = queryset.filter(
+            created_at__gte=make_aware(datetime.combine(created_from, time.min))
+        )
+    if created_to:
+        queryset = queryset.filter(
+            created_at__lt=make_aware(
+                datetime.combine(created_to + timedelta(days=1), time.min)
+            )
+        )
+    return queryset
+
+
+def to_export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def get_live_relation(instance, name):
+    related = getattr(instance, name, None)
+    if related is None or related.deleted_at is not None:
+        return None
+    return related
+
+
+def build_record(root_form):
+    record = {
+        field: to_export_value(getattr(root_form, field)) for field in FORM_FIELDS
+    }
+
+    personal_details = get_live_relation(root_form, "personal_details")
+    record["personal_details"] = personal_details and {
+        field: to_export_value(getattr(personal_details, field))
+        for field in PERSONAL_DETAILS_FIELDS
+    }
+
+    service_details = get_live_relation(root_form, "service_details")
+    record["service_details"] = service_details and {
+        **{
+            field: to_export_value(getattr(service_details, field))
+            for field in SERVICE_DETAILS_FIELDS
+        },
+        "exams": [
+            {
+                "exam_type": exam.exam_type,
+                **{field: to_export_value(getattr(exam, field)) for field in EXAM_FIELDS},
+            }
+            for exam in service_details.exams.all()
+        ],
+    }
+    return record
+
+
+def flatten_record(record):
+    personal_details = record["personal_details"] or {}
+    service_details = record["service_details"] or {}
+    exams = {exam["exam_type"]: exam for exam in service_details.get("exams", [])}
+
+    return (
+        [record[field] for field in FORM_FIELDS]
+        + [personal_details.get(field) for field in PERSONAL_DETAILS_FIELDS]
+        + [service_details.get(field) for field in SERVICE_DETAILS_FIELDS]
+        + [
+            exams.get(exam_type, {}).get(field)
+            for exam_type in EXAM_TYPES
+            for field in EXAM_FIELDS
+        ]
+    )
+
+
+def iter_records(queryset, chunk_size=2000):
+    # ``iterator()`` streams through a server-side cursor on Postgres and
+    # runs the exams prefetch once per chunk.
+    for root_form in queryset.iterator(chunk_size=chunk_size):
+        yield build_record(root_form)
+
+
+class Echo:
+    """File-like object that hands back what ``csv.writer`` writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for record in iter_records(queryset):
+        yield writer.writerow(flatten_record(record))
+
+
+def stream_jsonl(queryset):
+    for record in iter_records(queryset):
+        yield json.dumps(record) + "\n"
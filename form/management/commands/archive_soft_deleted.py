@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from form.archival import archive_soft_deleted, get_retention_cutoff, restore_archived
+
+
+class Command(BaseCommand):
+    help = (
+        "Move form rows soft-deleted longer than the retention period, with "
+        "their dependents, into the archive table. Every batch commits on its "
+        "own, so the command can be stopped and re-run at any point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention period, defaults to SOFT_DELETE_RETENTION_DAYS.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--sleep",
+            dest="pause",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches to spread out the load.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches per model.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be archived and roughly how much space it holds.",
+        )
+        parser.add_argument(
+            "--restore",
+            nargs=2,
+            metavar=("MODEL_LABEL", "OBJECT_ID"),
+            help="Restore an archived row and its dependents, e.g. form.RootForm <id>.",
+        )
+
+    def handle(self, *args, days, batch_size, pause, max_batches, dry_run, restore, **options):
+        if restore:
+            restored = restore_archived(*restore)
+            if not restored:
+                raise CommandError(f"No archived rows for {restore[0]} {restore[1]}.")
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} rows"))
+            return
+
+        if days is not None and days < 0:
+            raise CommandError("--days can't be negative.")
+
+        report = archive_soft_deleted(
+            get_retention_cutoff(days),
+            batch_size=batch_size,
+            max_batches=max_batches,
+            pause=pause,
+            dry_run=dry_run,
+        )
+        for label, entry in report.items():
+            if dry_run:
+                self.stdout.write(
+                    f"{label}: {entry['rows']} rows would be archived, "
+                    f"about {filesizeformat(entry['bytes'])}"
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS(f"{label}: archived {entry['rows']} rows")
+                )
+        if not report:
+            self.stdout.write("Nothing to archive")
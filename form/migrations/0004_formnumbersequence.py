@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    RootForm = apps.get_model("form", "RootForm")
+    FormNumberSequence = apps.get_model("form", "FormNumberSequence")
+
+    last_values = {}
+    for form_number in RootForm._base_manager.values_list(
+        "form_number", flat=True
+    ).iterator():
+        prefix, _, seq = form_number.rpartition("-")
+        if prefix and seq.isdigit():
+            last_values[prefix] = max(last_values.get(prefix, 0), int(seq))
+
+    FormNumberSequence.objects.bulk_create(
+        [
+            FormNumberSequence(prefix=prefix, last_value=last_value)
+            for prefix, last_value in last_values.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0003_alter_rootform_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormNumberSequence',
+            fields=[
+                ('prefix', models.CharField(max_length=20, primary_key=True, serialize=False, verbose_name='Prefix')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='Last value')),
+            ],
+            options={
+                'verbose_name': 'Form Number Sequence',
+                'verbose_name_plural': 'Form Number Sequences',
+                'db_table': 'form_number_sequence',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def build_search_documents(apps, schema_editor):
+    RootForm = apps.get_model("form", "RootForm")
+    forms = []
+    for form in RootForm._base_manager.select_related(
+        "user", "personal_details"
+    ).iterator(chunk_size=BATCH_SIZE):
+        parts = [form.form_number]
+        if form.user_id:
+            parts += [form.user.email, form.user.first_name, form.user.last_name]
+        personal_details = getattr(form, "personal_details", None)
+        if personal_details:
+            parts += [
+                personal_details.first_name,
+                personal_details.middle_name,
+                personal_details.last_name,
+                personal_details.email,
+                personal_details.pan_number,
+                personal_details.mobile_number,
+            ]
+        form.search_document = " ".join(part.lower() for part in parts if part)
+        forms.append(form)
+        # Written per chunk so only one chunk of forms is held in memory
+        if len(forms) == BATCH_SIZE:
+            RootForm._base_manager.bulk_update(forms, ["search_document"])
+            forms.clear()
+    RootForm._base_manager.bulk_update(forms, ["search_document"])
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS root_form_search_document_trgm "
+        "ON root_form USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS root_form_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0004_formnumbersequence'),
+        ('user', '0005_customuser_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rootform',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Search document'),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils.timezone import now
+
+
+def soft_delete_duplicate_exams(apps, schema_editor):
+    ExamDetail = apps.get_model("form", "ExamDetail")
+    live = ExamDetail._base_manager.filter(deleted_at__isnull=True)
+    duplicates = (
+        live.values("service_details_id", "exam_type")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    stale = []
+    for duplicate in duplicates.iterator():
+        ids = list(
+            live.filter(
+                service_details_id=duplicate["service_details_id"],
+                exam_type=duplicate["exam_type"],
+            )
+            .order_by("-updated_at", "-created_at")
+            .values_list("id", flat=True)
+        )
+        stale += ids[1:]
+    ExamDetail._base_manager.filter(id__in=stale).update(deleted_at=now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0005_rootform_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(soft_delete_duplicate_exams, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='examdetail',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('service_details', 'exam_type'), name='unique_live_exam_type'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:54
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0006_examdetail_unique_live_exam_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Model')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object id')),
+                ('root_label', models.CharField(max_length=100, verbose_name='Root model')),
+                ('root_id', models.CharField(max_length=64, verbose_name='Root object id')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Deleted at')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived at')),
+            ],
+            options={
+                'verbose_name': 'Archived Record',
+                'verbose_name_plural': 'Archived Records',
+                'db_table': 'archived_record',
+                'indexes': [models.Index(fields=['root_label', 'root_id'], name='archived_record_root'), models.Index(fields=['model_label', 'object_id'], name='archived_record_object')],
+            },
+        ),
+    ]
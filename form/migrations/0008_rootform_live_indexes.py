@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form', '0007_archivedrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rootform',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['created_at'], name='root_form_live_created'),
+        ),
+        migrations.AddIndex(
+            model_name='rootform',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'created_at'], name='root_form_live_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='rootform',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['user', 'created_at'], name='root_form_live_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='rootform',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['created_by', 'created_at'], name='root_form_live_creator_created'),
+        ),
+    ]
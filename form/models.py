@@ -1,5 +1,10 @@
 from datetime import datetime
+from threading import Lock
 from services.models import BaseAuditModel
+from services.search import build_search_document
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
 from django.db.models import (
     BigIntegerField,
     BooleanField,
@@ -7,41 +12,105 @@ from django.db.models import (
     CharField,
     DateField,
     ForeignKey,
+    Index,
     IntegerChoices,
     JSONField,
-    Max,
+    Model,
     OneToOneField,
+    Q,
     SET_NULL,
     TextChoices,
+    TextField,
+    UniqueConstraint,
 )
 from django.db.models.fields import DateTimeField, PositiveSmallIntegerField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.functions import Cast, Substr
 from django.utils.translation import gettext_lazy as _
 
 
-def generate_form_number():
-    today = datetime.now()
-    date_str = today.strftime("%Y%d%m")  # YYYYDDMM
-    prefix = f"FN-{date_str}"
-    prefix_length = len(prefix)
-
-    max_seq_data = (
-        RootForm.all_objects.filter(form_number__startswith=prefix)
-        .annotate(
-            numeric_part=Cast(
-                Substr("form_number", prefix_length + 2), BigIntegerField()
-            )
-        )
-        .aggregate(max_seq=Max("numeric_part"))
+def form_number_prefix(day=None):
+    day = day or datetime.now()
+    return f"FN-{day.strftime('%Y%d%m')}"  # YYYYDDMM
+
+
+def reserve_form_numbers(prefix, count=1):
+    """Reserve ``count`` numbers on the day's counter row and return the first.
+
+    The counter is bumped by one ``UPDATE ... RETURNING``, a single short
+    statement in autocommit mode. Inside a transaction its row stays locked
+    until commit and a rollback gives the numbers back;
+    ``FORM_NUMBER_BLOCK_SIZE`` makes those reservations rarer.
+    """
+    using = router.db_for_write(FormNumberSequence)
+    connection = connections[using]
+    table = connection.ops.quote_name(FormNumberSequence._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET last_value = last_value + %s "
+        "WHERE prefix = %s RETURNING last_value"
     )
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(sql, [count, prefix])
+            row = cursor.fetchone()
+            if row is not None:
+                return row[0] - count + 1
+            # First reservation of the day; a concurrent insert wins harmlessly
+            FormNumberSequence.objects.using(using).bulk_create(
+                [FormNumberSequence(prefix=prefix)], ignore_conflicts=True
+            )
+
+
+_reserved_blocks = {}
+_reserved_blocks_lock = Lock()
+
+
+def next_form_sequence(prefix):
+    """Next number for ``prefix``, served from a per-worker block when
+    ``FORM_NUMBER_BLOCK_SIZE`` > 1. The rest of a block is only published once
+    the reserving transaction commits, so a rollback never hands out numbers
+    twice; numbers stay unique but may have gaps across workers.
+    """
+    block_size = getattr(settings, "FORM_NUMBER_BLOCK_SIZE", 1)
+    if block_size <= 1:
+        return reserve_form_numbers(prefix)
+
+    with _reserved_blocks_lock:
+        next_value, last_value = _reserved_blocks.pop(prefix, (1, 0))
+        if next_value <= last_value:
+            _reserved_blocks[prefix] = (next_value + 1, last_value)
+            return next_value
+
+    first_value = reserve_form_numbers(prefix, block_size)
+    block = (first_value + 1, first_value + block_size - 1)
+
+    def publish_block():
+        with _reserved_blocks_lock:
+            # Drop blocks of previous days, only today's prefix is handed out.
+            _reserved_blocks.clear()
+            _reserved_blocks[prefix] = block
+
+    transaction.on_commit(publish_block)
+    return first_value
+
+
+def generate_form_number():
+    prefix = form_number_prefix()
+    return f"{prefix}-{next_form_sequence(prefix)}"
+
 
-    if max_seq_data["max_seq"] is not None:
-        next_seq = max_seq_data["max_seq"] + 1
-    else:
-        next_seq = 1
+class FormNumberSequence(Model):
+    """Per-day counter backing ``generate_form_number``."""
 
-    return f"{prefix}-{next_seq}"
+    prefix = CharField(max_length=20, primary_key=True, verbose_name=_("Prefix"))
+    last_value = BigIntegerField(default=0, verbose_name=_("Last value"))
+
+    class Meta:
+        verbose_name = _("Form Number Sequence")
+        verbose_name_plural = _("Form Number Sequences")
+        db_table = "form_number_sequence"
+
+    def __str__(self):
+        return f"{self.prefix} <{self.last_value}>"
 
 
 class FormStep(IntegerChoices):
@@ -80,16 +149,59 @@ class RootForm(BaseAuditModel):
         max_length=30,
         default=generate_form_number,
     )
+    search_document = TextField(
+        blank=True, default="", editable=False, verbose_name=_("Search document")
+    )
 
     class Meta(BaseAuditModel.Meta):
         verbose_name = _("Root Form")
         verbose_name_plural = _("Root Forms")
         db_table = "root_form"
         ordering = ["-created_at"]
+        # Partial on live rows, matching what SoftDeletionManager queries read
+        indexes = [
+            Index(
+                fields=["created_at"],
+                condition=Q(deleted_at__isnull=True),
+                name="root_form_live_created",
+            ),
+            Index(
+                fields=["status", "created_at"],
+                condition=Q(deleted_at__isnull=True),
+                name="root_form_live_status_created",
+            ),
+            Index(
+                fields=["user", "created_at"],
+                condition=Q(deleted_at__isnull=True),
+                name="root_form_live_user_created",
+            ),
+            Index(
+                fields=["created_by", "created_at"],
+                condition=Q(deleted_at__isnull=True),
+                name="root_form_live_creator_created",
+            ),
+        ]
 
     def __str__(self):
         return f"Form {self.form_number}"
 
+    def build_search_document(self):
+        parts = [self.form_number]
+        if self.user_id:
+            parts += [self.user.email, self.user.first_name, self.user.last_name]
+        if not self._state.adding:
+            personal_details = getattr(self, "personal_details", None)
+            if personal_details:
+                parts += [
+                    personal_details.first_name,
+                    personal_details.middle_name,
+                    personal_details.last_name,
+                    personal_details.email,
+                    personal_details.pan_number,
+                    personal_details.mobile_number,
+                ]
+        return build_search_document(*parts)
+
 
 class PersonalDetails(BaseAuditModel):
     class Gender(TextChoices):
@@ -174,10 +286,54 @@ class ExamDetail(BaseAuditModel):
         validators=[MinValueValidator(1), MaxValueValidator(5)], null=True, blank=True
     )
 
+    class Meta(BaseAuditModel.Meta):
+        constraints = [
+            UniqueConstraint(
+                fields=["service_details", "exam_type"],
+                condition=Q(deleted_at__isnull=True),
+                name="unique_live_exam_type",
+            )
+        ]
+
     def __str__(self):
         return f"{self.get_exam_type_display()} - {self.service_details.id}"
 
 
+class ArchivedRecord(Model):
+    """Serialized copy of a soft-deleted row moved out of its hot table.
+
+    ``root_label``/``root_id`` name the row whose retention expiry pulled this
+    one in, so a whole form can be restored together.
+    """
+
+    model_label = CharField(max_length=100, verbose_name=_("Model"))
+    object_id = CharField(max_length=64, verbose_name=_("Object id"))
+    root_label = CharField(max_length=100, verbose_name=_("Root model"))
+    root_id = CharField(max_length=64, verbose_name=_("Root object id"))
+    data = JSONField(encoder=DjangoJSONEncoder, verbose_name=_("Data"))
+    deleted_at = DateTimeField(null=True, blank=True, verbose_name=_("Deleted at"))
+    archived_at = DateTimeField(auto_now_add=True, verbose_name=_("Archived at"))
+
+    class Meta:
+        verbose_name = _("Archived Record")
+        verbose_name_plural = _("Archived Records")
+        db_table = "archived_record"
+        indexes = [
+            Index(fields=["root_label", "root_id"], name="archived_record_root"),
+            Index(fields=["model_label", "object_id"], name="archived_record_object"),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label} {self.object_id}"
+
+
+def refresh_search_documents(queryset):
+    forms = list(queryset.select_related("user", "personal_details"))
+    for form in forms:
+        form.search_document = form.build_search_document()
+    RootForm.all_objects.bulk_update(forms, ["search_document"])
+
+
 STEP_MODEL_MAPPING = {
     "PersonalDetails": FormStep.PERSONAL_DETAILS,
     "ServiceDetails": FormStep.SERVICE_DETAILS,
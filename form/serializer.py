@@ -1,5 +1,4 @@
 from django.db import transaction
-from django.utils.timezone import now
 from rest_framework import serializers
 from django.db.transaction import set_rollback
 from .models import (
@@ -7,23 +6,23 @@ from .models import (
     PersonalDetails,
     ServiceDetails,
     ExamDetail,
-    FormStep,
 )
+from services.projection import Projection
 
-
-def update_current_step(root_form, step):
-    root_form.current_step = step
-    root_form.save()
-    return root_form
+from .exams import reconcile_exams
+from .steps import complete_step, save_step
 
 
 class RootFormListSerializer(serializers.ModelSerializer):
     class Meta:
         model = RootForm
-        fields = "__all__"
+        exclude = ["search_document"]
         read_only_fields = ["created_at", "updated_at"]
 
 
+root_form_list_projection = Projection(RootFormListSerializer)
+
+
 class RootFormStepBaseSerializer(serializers.ModelSerializer):
     root_form = RootFormListSerializer(write_only=True, required=False)
     root_form_id = serializers.PrimaryKeyRelatedField(
@@ -33,23 +32,11 @@ class RootFormStepBaseSerializer(serializers.ModelSerializer):
     class Meta:
         fields = "__all__"
         extra_kwargs = {"root_form": {"required": False}}
-        next_step = FormStep.SERVICE_DETAILS
-        is_final_step = False
-
-    def update_current_step(self, root_form):
-        # Only mark as completed if this is the final step
-        if self.Meta.is_final_step:
-            root_form.status = RootForm.Status.COMPLETED
-            root_form.completed_at = now()
-        root_form.current_step = self.Meta.next_step
-        root_form.save()
-        return root_form
 
 
 class PersonalDetailsSerializer(RootFormStepBaseSerializer):
     class Meta(RootFormStepBaseSerializer.Meta):
         model = PersonalDetails
-        next_step = FormStep.SERVICE_DETAILS
 
     def validate(self, attrs):
         if attrs.get("is_step_completed"):
@@ -81,19 +68,25 @@ class PersonalDetailsSerializer(RootFormStepBaseSerializer):
             validated_data["created_by"] = user
             root_form = validated_data.pop("root_form_id")
             validated_data["root_form"] = root_form
-            personal_details = PersonalDetails.objects.create(**validated_data)
-            self.update_current_step(root_form=root_form)
+            personal_details = PersonalDetails(**validated_data)
+            save_step(personal_details)
 
         return personal_details
 
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        save_step(instance)
+
+        return instance
 
-        self.update_current_step(root_form=instance.root_form)
 
-        return super().update(instance, validated_data=validated_data)
+class ExamDetailListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Filtered in Python so a prefetched ``exams`` cache is still used
+        if hasattr(data, "all"):
+            data = [exam for exam in data.all() if exam.deleted_at is None]
+        return super().to_representation(data)
 
 
 class ExamDetailSerializer(serializers.ModelSerializer):
@@ -101,6 +94,7 @@ class ExamDetailSerializer(serializers.ModelSerializer):
         model = ExamDetail
         fields = ["exam_type", "passing_date", "attempt_count"]
         read_only_fields = ["service_details"]
+        list_serializer_class = ExamDetailListSerializer
 
 
 class ServiceDetailsSerializer(RootFormStepBaseSerializer):
@@ -108,46 +102,53 @@ class ServiceDetailsSerializer(RootFormStepBaseSerializer):
 
     class Meta(RootFormStepBaseSerializer.Meta):
         model = ServiceDetails
-        next_step = FormStep.SERVICE_DETAILS
-        is_final_step = True
+
+    def validate_exams(self, exams):
+        exam_types = [exam["exam_type"] for exam in exams]
+        duplicates = sorted({t for t in exam_types if exam_types.count(t) > 1})
+        if duplicates:
+            raise serializers.ValidationError(
+                f"Duplicate exam types: {', '.join(duplicates)}."
+            )
+        return exams
 
     def create(self, validated_data):
         exams = validated_data.pop("exams", [])
         user = self.context["user"]
 
         with transaction.atomic():
-            validated_data["created_by"] = user
             root_form = validated_data.pop("root_form_id")
-            validated_data["root_form"] = root_form
-            existing_step = ServiceDetails.objects.filter(root_form=root_form).first()
-            if existing_step:
-                ExamDetail.all_objects.filter(service_details=existing_step).delete()
-                existing_step.delete()
-
-            service_details = ServiceDetails.objects.create(**validated_data)
+            service_details = ServiceDetails.all_objects.filter(
+                root_form=root_form
+            ).first()
+            if service_details:
+                # Resubmitting the step edits the existing row in place
+                for attr, value in validated_data.items():
+                    setattr(service_details, attr, value)
+                service_details.deleted_at = None
+                service_details.save()
+            else:
+                service_details = ServiceDetails.objects.create(
+                    created_by=user, root_form=root_form, **validated_data
+                )
 
-            ExamDetail.objects.bulk_create(
-                [ExamDetail(service_details=service_details, **exam) for exam in exams]
-            )
-            self.update_current_step(root_form=root_form)
+            reconcile_exams({service_details: exams})
+            complete_step(service_details)
 
         return service_details
 
     def update(self, instance, validated_data):
-        exams = validated_data.pop("exams", [])
+        exams = validated_data.pop("exams", None)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
         if exams is not None:
-            instance.exams.all().delete()
-            ExamDetail.objects.bulk_create(
-                [ExamDetail(service_details=instance, **exam) for exam in exams]
-            )
+            reconcile_exams({instance: exams})
 
-        self.update_current_step(root_form=instance.root_form)
-        return super().update(instance=instance, validated_data=validated_data)
+        complete_step(instance)
+        return instance
 
 
 class RootFormSerializer(serializers.ModelSerializer):
@@ -155,7 +156,7 @@ class RootFormSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = RootForm
-        fields = "__all__"
+        exclude = ["search_document"]
         read_only_fields = ["created_at", "updated_at"]
 
     def create(self, validated_data):
@@ -184,4 +185,4 @@ class RootFormDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = RootForm
-        fields = "__all__"
+        exclude = ["search_document"]
@@ -1,27 +1,72 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import PersonalDetails, ServiceDetails, STEP_MODEL_MAPPING
+from services.counts import bump_table_generation
 
+from user.models import CustomUser
+from user.profile_cache import invalidate_cached_profile
+
+from .models import (
+    PersonalDetails,
+    RootForm,
+    refresh_search_documents,
+)
+
+# The user fields copied into each form's search document
+SEARCHED_USER_FIELDS = ("email", "first_name", "last_name")
+
+
+@receiver(post_save, sender=RootForm)
+@receiver(post_delete, sender=RootForm)
+def invalidate_root_form_counts(sender, instance, **kwargs):
+    bump_table_generation(sender._meta.db_table)
 
-@receiver(post_save, sender=PersonalDetails)
-@receiver(post_save, sender=ServiceDetails)
-def update_form_step_on_step_complete(sender, instance, **kwargs):
-    if not getattr(instance, "is_step_completed", False):
-        return
 
-    root_form = getattr(instance, "root_form", None)
-    if not root_form:
+@receiver(post_save, sender=RootForm)
+@receiver(post_delete, sender=RootForm)
+def invalidate_creator_profile(sender, instance, raw=False, **kwargs):
+    # ``/me`` carries the id of the latest form the user created
+    if instance.created_by_id and not raw:
+        invalidate_cached_profile(instance.created_by_id)
+
+
+@receiver(pre_save, sender=RootForm)
+def set_root_form_search_document(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    # Fixtures and restored archives already carry their document
+    if raw:
         return
+    if update_fields is not None:
+        rebuild = "search_document" in update_fields
+    else:
+        # The receivers below keep the stored document current, so other
+        # saves only rebuild it for new forms or a newly assigned user,
+        # reading the relations already loaded on the instance
+        rebuild = instance._state.adding or RootForm.user.is_cached(instance)
+    if rebuild:
+        instance.search_document = instance.build_search_document()
+
 
-    current_steps = list(root_form.step_completed or [])
-    if not isinstance(current_steps, list):
-        current_steps = []
+@receiver(post_save, sender=PersonalDetails)
+def refresh_search_document_on_personal_details(sender, instance, **kwargs):
+    # ``save_step`` writes the document along with the step transition
+    if getattr(instance, "_search_document_deferred", False):
+        return
+    refresh_search_documents(RootForm.all_objects.filter(pk=instance.root_form_id))
 
-    model_name = sender.__name__
-    step_enum = STEP_MODEL_MAPPING.get(model_name)
 
-    if step_enum and step_enum not in current_steps:
-        current_steps.append(step_enum)
-        root_form.step_completed = current_steps
-        root_form.save(update_fields=["step_completed"])
+@receiver(post_save, sender=CustomUser)
+def refresh_search_documents_on_user(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created:
+        return
+    fields = [
+        name
+        for name in SEARCHED_USER_FIELDS
+        if update_fields is None or name in update_fields
+    ]
+    # Logins only touch ``last_login``, so most saves skip the forms entirely
+    if fields and instance.has_changed(*fields):
+        refresh_search_documents(RootForm.all_objects.filter(user=instance))
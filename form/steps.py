@@ -0,0 +1,196 @@
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, F, JSONField, Value, When
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
+
+from .models import PersonalDetails, RootForm, STEP_MODEL_MAPPING
+
+MAX_TRANSITION_ATTEMPTS = 5
+
+
+class StepNode(NamedTuple):
+    step: int
+    next_step: int
+    is_final: bool
+
+
+class StepTransitionConflict(Exception):
+    pass
+
+
+def build_step_graph(mapping=STEP_MODEL_MAPPING):
+    """Map each step model name to its node, ordered by ``FormStep`` value.
+
+    Completing a step moves the form on to the following step; the last step
+    stays current and completes the form.
+    """
+    ordered = sorted(mapping.items(), key=lambda item: item[1])
+    graph = {}
+    for position, (model_name, step) in enumerate(ordered):
+        is_final = position == len(ordered) - 1
+        graph[model_name] = StepNode(
+            step=step,
+            next_step=step if is_final else ordered[position + 1][1],
+            is_final=is_final,
+        )
+    return graph
+
+
+STEP_GRAPH = build_step_graph()
+
+
+def get_step_node(step_instance):
+    return STEP_GRAPH[type(step_instance).__name__]
+
+
+def append_step(step_completed, step):
+    steps = list(step_completed) if isinstance(step_completed, list) else []
+    if step not in steps:
+        steps.append(step)
+    return steps
+
+
+def apply_transition(root_form, node, timestamp, step_completed=None, **values):
+    """Mirror a transition that was written to the database on ``root_form``"""
+    root_form.current_step = max(root_form.current_step, node.next_step)
+    root_form.updated_at = timestamp
+    for attr, value in values.items():
+        setattr(root_form, attr, value)
+    if node.is_final:
+        root_form.status = RootForm.Status.COMPLETED
+        root_form.completed_at = timestamp
+    if step_completed is not None:
+        root_form.step_completed = step_completed
+
+
+def complete_step(step_instance, timestamp=None, **extra):
+    """Advance the step's root form with a single conditional UPDATE.
+
+    When the step is marked completed the UPDATE only matches while
+    ``step_completed`` still holds the value it was computed from, and is
+    retried against a fresh read if another submission got there first.
+    ``extra`` holds other root form fields to write in the same UPDATE.
+    """
+    node = get_step_node(step_instance)
+    root_form = step_instance.root_form
+    timestamp = timestamp or now()
+    values = {
+        "current_step": Greatest(F("current_step"), Value(node.next_step)),
+        "updated_at": timestamp,
+        **extra,
+    }
+    if node.is_final:
+        values.update(status=RootForm.Status.COMPLETED, completed_at=timestamp)
+
+    queryset = RootForm.all_objects.filter(pk=root_form.pk)
+    if not step_instance.is_step_completed:
+        queryset.update(**values)
+        apply_transition(root_form, node, timestamp, **extra)
+        return root_form
+
+    observed = root_form.step_completed
+    for _ in range(MAX_TRANSITION_ATTEMPTS):
+        step_completed = append_step(observed, node.step)
+        if queryset.filter(step_completed=observed).update(
+            step_completed=step_completed, **values
+        ):
+            apply_transition(root_form, node, timestamp, step_completed, **extra)
+            return root_form
+        observed = queryset.values_list("step_completed", flat=True).first()
+        if observed is None:
+            raise RootForm.DoesNotExist("Root form no longer exists.")
+
+    raise StepTransitionConflict(
+        f"Could not complete step {node.step} on form {root_form.pk}."
+    )
+
+
+def save_step(step_instance, timestamp=None):
+    """Save a step submission and advance its root form.
+
+    Personal details feed the form's search document, which goes out with
+    the transition's UPDATE instead of from the PersonalDetails post_save
+    receiver, so each submission writes the root form once.
+    """
+    if not isinstance(step_instance, PersonalDetails):
+        step_instance.save()
+        return complete_step(step_instance, timestamp)
+
+    root_form = step_instance.root_form
+    root_form.personal_details = step_instance
+    step_instance._search_document_deferred = True
+    try:
+        step_instance.save()
+    finally:
+        del step_instance._search_document_deferred
+    return complete_step(
+        step_instance, timestamp, search_document=root_form.build_search_document()
+    )
+
+
+def complete_steps(step_instances, timestamp=None):
+    """Advance the root forms of many saved steps with one UPDATE.
+
+    The affected rows are locked while their ``step_completed`` lists are
+    read, so single-step transitions running alongside retry instead of
+    being overwritten.
+    """
+    timestamp = timestamp or now()
+    nodes = {}
+    for step_instance in step_instances:
+        nodes.setdefault(step_instance.root_form_id, []).append(
+            (get_step_node(step_instance), step_instance.is_step_completed)
+        )
+    if not nodes:
+        return
+
+    with transaction.atomic():
+        current = dict(
+            RootForm.all_objects.select_for_update()
+            .filter(pk__in=nodes)
+            .values_list("pk", "step_completed")
+        )
+        transitions = {}
+        for pk, entries in nodes.items():
+            step_completed = current.get(pk)
+            for node, is_step_completed in entries:
+                if is_step_completed:
+                    step_completed = append_step(step_completed, node.step)
+            transitions[pk] = {
+                "next_step": max(node.next_step for node, _ in entries),
+                "completed": any(node.is_final for node, _ in entries),
+                "step_completed": step_completed,
+            }
+
+        completed = [pk for pk, t in transitions.items() if t["completed"]]
+        RootForm.all_objects.filter(pk__in=transitions).update(
+            current_step=Greatest(
+                F("current_step"),
+                Case(
+                    *[
+                        When(pk=pk, then=Value(t["next_step"]))
+                        for pk, t in transitions.items()
+                    ]
+                ),
+            ),
+            step_completed=Case(
+                *[
+                    When(
+                        pk=pk,
+                        then=Value(t["step_completed"], output_field=JSONField()),
+                    )
+                    for pk, t in transitions.items()
+                ]
+            ),
+            status=Case(
+                When(pk__in=completed, then=Value(RootForm.Status.COMPLETED)),
+                default=F("status"),
+            ),
+            completed_at=Case(
+                When(pk__in=completed, then=Value(timestamp)),
+                default=F("completed_at"),
+            ),
+            updated_at=timestamp,
+        )
@@ -1,3 +1,1046 @@
-from django.test import TestCase
+import csv
+import json
+from base64 import urlsafe_b64encode
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import make_aware, now
+from rest_framework.renderers import JSONRenderer
+
+from services.cache import check_shared_cache
+from services.counts import (
+    bump_table_generation,
+    get_exact_count,
+    get_queryset_tables,
+)
+from user.authentication import issue_refresh_token
+from user.enums import UserRoleEnum
+from user.models import CustomUser
+
+from .archival import archive_soft_deleted, restore_archived
+from .exams import get_live_exams, reconcile_exams
+from .models import (
+    ArchivedRecord,
+    ExamDetail,
+    FormNumberSequence,
+    FormStep,
+    PersonalDetails,
+    RootForm,
+    ServiceDetails,
+    _reserved_blocks,
+    form_number_prefix,
+    next_form_sequence,
+    reserve_form_numbers,
+)
+from .serializer import (
+    RootFormDetailSerializer,
+    RootFormListSerializer,
+    root_form_list_projection,
+)
+from .steps import complete_step
+from .views import RootFormViewSet
+
+
+class RootFormDetailQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        cls.root_form = RootForm.objects.create(user=cls.user, created_by=cls.user)
+        PersonalDetails.objects.create(
+            root_form=cls.root_form,
+            email="employee@example.com",
+            first_name="First",
+            middle_name="Middle",
+            last_name="Last",
+            gender=PersonalDetails.Gender.FEMALE,
+            mobile_number="9999999999",
+            pan_number="ABCDE1234F",
+        )
+        service_details = ServiceDetails.objects.create(
+            root_form=cls.root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+        for exam_type in ("pre_service", "ccc"):
+            ExamDetail.objects.create(
+                service_details=service_details, exam_type=exam_type
+            )
+        ExamDetail.objects.create(
+            service_details=service_details, exam_type="lrq"
+        ).delete()
+
+    def test_retrieve_loads_full_detail_in_two_queries(self):
+        view = RootFormViewSet(action="retrieve")
+
+        with self.assertNumQueries(2):
+            root_form = view.get_queryset().get(pk=self.root_form.pk)
+            data = RootFormDetailSerializer(root_form).data
+
+        self.assertEqual(data["personal_details"]["first_name"], "First")
+        self.assertEqual(
+            sorted(exam["exam_type"] for exam in data["service_details"]["exams"]),
+            ["ccc", "pre_service"],
+        )
+
+
+class StepTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+
+    def setUp(self):
+        self.root_form = RootForm.objects.create(user=self.user, created_by=self.user)
+
+    def personal_details_payload(self):
+        return {
+            "root_form_id": str(self.root_form.pk),
+            "email": "employee@example.com",
+            "first_name": "First",
+            "middle_name": "Middle",
+            "last_name": "Last",
+            "gender": PersonalDetails.Gender.FEMALE,
+            "mobile_number": "9999999999",
+            "pan_number": "ABCDE1234F",
+            "is_step_completed": True,
+        }
+
+    def capture_writes(self, method, url, payload):
+        token = issue_refresh_token(self.user).access_token
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                url,
+                payload,
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+        self.assertLess(response.status_code, 300, response.content)
+        return [
+            " ".join(query["sql"].split()[:2])
+            for query in queries.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+
+    def test_step_submission_writes_root_form_once(self):
+        writes = self.capture_writes(
+            "post",
+            reverse("form:personal-details-list"),
+            self.personal_details_payload(),
+        )
+        self.assertEqual(writes, ["INSERT INTO", 'UPDATE "root_form"'])
+
+        personal_details = PersonalDetails.objects.get(root_form=self.root_form)
+        writes = self.capture_writes(
+            "patch",
+            reverse("form:personal-details-detail", args=[personal_details.pk]),
+            {"first_name": "Renamed", "is_step_completed": True},
+        )
+        self.assertEqual(writes, ['UPDATE "personal_details"', 'UPDATE "root_form"'])
+
+        self.root_form.refresh_from_db()
+        self.assertEqual(self.root_form.current_step, FormStep.SERVICE_DETAILS)
+        self.assertEqual(self.root_form.step_completed, [FormStep.PERSONAL_DETAILS])
+        self.assertEqual(self.root_form.status, RootForm.Status.PENDING)
+        self.assertIn("renamed", self.root_form.search_document)
+        self.assertNotIn("first", self.root_form.search_document)
+
+    def test_stale_form_keeps_concurrent_completion(self):
+        stale_root_form = RootForm.objects.get(pk=self.root_form.pk)
+        complete_step(
+            PersonalDetails(root_form=self.root_form, is_step_completed=True)
+        )
+
+        complete_step(
+            ServiceDetails(root_form=stale_root_form, is_step_completed=True)
+        )
+
+        self.root_form.refresh_from_db()
+        self.assertEqual(
+            self.root_form.step_completed,
+            [FormStep.PERSONAL_DETAILS, FormStep.SERVICE_DETAILS],
+        )
+        self.assertEqual(self.root_form.status, RootForm.Status.COMPLETED)
+        self.assertIsNotNone(self.root_form.completed_at)
+
+
+class ReconcileExamsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        root_form = RootForm.objects.create(user=user, created_by=user)
+        cls.service_details = ServiceDetails.objects.create(
+            root_form=root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+
+    def test_only_changed_rows_are_written(self):
+        reconcile_exams(
+            {
+                self.service_details: [
+                    {"exam_type": "ccc"},
+                    {"exam_type": "lrq", "attempt_count": 1},
+                ]
+            }
+        )
+        ccc = ExamDetail.objects.get(exam_type="ccc")
+
+        reconcile_exams(
+            {
+                self.service_details: [
+                    {"exam_type": "ccc"},
+                    {"exam_type": "hrq", "attempt_count": 2},
+                ]
+            }
+        )
+
+        live = ExamDetail.objects.filter(service_details=self.service_details)
+        self.assertEqual(sorted(live.values_list("exam_type", flat=True)), ["ccc", "hrq"])
+        self.assertEqual(live.get(exam_type="ccc").pk, ccc.pk)
+        self.assertEqual(ExamDetail.all_objects.count(), 3)
+
+    def test_concurrent_insert_is_retried(self):
+        # Committed by another request after this one read the live exams
+        ccc = ExamDetail.objects.create(
+            service_details=self.service_details, exam_type="ccc"
+        )
+        reads = []
+
+        def read_stale_once(service_details):
+            reads.append(service_details)
+            return {} if len(reads) == 1 else get_live_exams(service_details)
+
+        with patch("form.exams.get_live_exams", side_effect=read_stale_once):
+            reconcile_exams(
+                {self.service_details: [{"exam_type": "ccc", "attempt_count": 2}]}
+            )
+
+        self.assertEqual(len(reads), 2)
+        live = ExamDetail.objects.get(service_details=self.service_details)
+        self.assertEqual((live.pk, live.attempt_count), (ccc.pk, 2))
+
+    def test_persistent_conflict_is_a_bad_request(self):
+        ExamDetail.objects.create(service_details=self.service_details, exam_type="ccc")
+        token = issue_refresh_token(self.service_details.root_form.user).access_token
+
+        with patch("form.exams.get_live_exams", return_value={}):
+            response = self.client.patch(
+                reverse("form:service-details-detail", args=[self.service_details.pk]),
+                {"exams": [{"exam_type": "ccc"}]},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ExamDetail.objects.count(), 1)
+
+
+class ArchivalTests(TestCase):
+    def test_archive_and_restore_round_trip(self):
+        user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        root_form = RootForm.objects.create(user=user, created_by=user)
+        service_details = ServiceDetails.objects.create(
+            root_form=root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+        ExamDetail.objects.create(service_details=service_details, exam_type="ccc")
+        root_form.delete()
+
+        report = archive_soft_deleted(cutoff=now() + timedelta(seconds=1))
+
+        self.assertEqual(report["form.ExamDetail"]["rows"], 1)
+        self.assertFalse(RootForm.all_objects.filter(pk=root_form.pk).exists())
+        self.assertEqual(ArchivedRecord.objects.count(), 3)
+
+        self.assertEqual(restore_archived("form.RootForm", root_form.pk), 3)
+        restored = RootForm.all_objects.get(pk=root_form.pk)
+        self.assertIsNotNone(restored.deleted_at)
+        self.assertEqual(restored.service_details.exams.get().exam_type, "ccc")
+        self.assertFalse(ArchivedRecord.objects.exists())
+
+    def test_dry_run_counts_each_row_once(self):
+        user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        root_form = RootForm.objects.create(user=user, created_by=user)
+        service_details = ServiceDetails.objects.create(
+            root_form=root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+        exam = ExamDetail.objects.create(
+            service_details=service_details, exam_type="ccc"
+        )
+        # Expired on their own too, so each model's batches find them again
+        for obj in (exam, service_details, root_form):
+            obj.delete()
+        cutoff = now() + timedelta(seconds=1)
+
+        dry_run = archive_soft_deleted(cutoff=cutoff, batch_size=1, dry_run=True)
+        report = archive_soft_deleted(cutoff=cutoff, batch_size=1)
+
+        self.assertEqual(
+            {label: entry["rows"] for label, entry in dry_run.items()},
+            {label: entry["rows"] for label, entry in report.items()},
+        )
+        self.assertEqual(dry_run["form.ExamDetail"]["rows"], 1)
+        self.assertEqual(ArchivedRecord.objects.count(), 3)
+
+
+class RootFormQueryPlanTests(TestCase):
+    """Hot list queries must be served by the partial ``root_form`` indexes.
+
+    On Postgres sequential scans are disabled for the test so any plan that
+    still contains one has no usable index; SQLite reports index use directly.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(
+                email=f"employee{i}@example.com", password="password"
+            )
+            for i in range(2)
+        ]
+        statuses = list(RootForm.Status.values)
+        RootForm.objects.bulk_create(
+            [
+                RootForm(
+                    user=cls.users[i % 2],
+                    created_by=cls.users[i % 2],
+                    status=statuses[i % len(statuses)],
+                    deleted_at=now() if i % 10 == 0 else None,
+                )
+                for i in range(200)
+            ]
+        )
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndexes(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            self.assertNotIn("Seq Scan", plan, plan)
+            return
+        full_scans = [
+            line
+            for line in plan.splitlines()
+            if " SCAN " in f" {line.split(maxsplit=3)[-1]}"
+            and "USING" not in line
+        ]
+        self.assertEqual(full_scans, [], plan)
+
+    def test_default_list(self):
+        self.assertUsesIndexes(RootForm.objects.all()[:10])
+
+    def test_status_filtered_list(self):
+        self.assertUsesIndexes(
+            RootForm.objects.filter(status__in=[RootForm.Status.COMPLETED])[:10]
+        )
+
+    def test_forms_of_user(self):
+        self.assertUsesIndexes(RootForm.objects.filter(user=self.users[0])[:10])
+
+    def test_latest_form_of_creator(self):
+        self.assertUsesIndexes(
+            RootForm.objects.filter(created_by=self.users[0]).order_by("-created_at")[:1]
+        )
+
+    def test_detail_with_steps(self):
+        root_form = RootForm.objects.first()
+        self.assertUsesIndexes(
+            RootFormViewSet(action="retrieve").get_queryset().filter(pk=root_form.pk)
+        )
+
+
+class RootFormConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        cls.root_form = RootForm.objects.create(user=cls.user, created_by=cls.user)
+        cls.service_details = ServiceDetails.objects.create(
+            root_form=cls.root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+
+    def setUp(self):
+        token = issue_refresh_token(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.url = reverse("form:root-form-detail", args=[self.root_form.pk])
+
+    def test_unchanged_form_is_not_modified(self):
+        etag = self.client.get(self.url, headers=self.headers)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, headers={**self.headers, "If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_step_change_updates_etag(self):
+        etag = self.client.get(self.url, headers=self.headers)["ETag"]
+        ExamDetail.objects.create(service_details=self.service_details, exam_type="ccc")
+
+        response = self.client.get(
+            self.url, headers={**self.headers, "If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_if_match_is_rejected(self):
+        response = self.client.patch(
+            self.url,
+            {"status": RootForm.Status.COMPLETED},
+            content_type="application/json",
+            headers={**self.headers, "If-Match": '"stale"'},
+        )
+
+        self.assertEqual(response.status_code, 412)
+
+
+class RootFormListProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        RootForm.objects.create(user=cls.user, created_by=cls.user)
+        RootForm.objects.create(
+            user=cls.user,
+            created_by=cls.user,
+            form_number="EMS-1",
+            status=RootForm.Status.COMPLETED,
+            current_step=2,
+            step_completed=[1, 2],
+            completed_at=now(),
+        )
+
+    def test_projection_matches_serializer(self):
+        queryset = RootForm.objects.order_by("created_at")
+
+        self.assertEqual(
+            JSONRenderer().render(
+                root_form_list_projection.render(
+                    root_form_list_projection.values(queryset)
+                )
+            ),
+            JSONRenderer().render(RootFormListSerializer(queryset, many=True).data),
+        )
+
+    def test_cursor_pages_follow_projected_rows(self):
+        token = issue_refresh_token(self.user).access_token
+        headers = {"Authorization": f"Bearer {token}"}
+        url = reverse("form:root-form-list")
+
+        first = self.client.get(url, {"cursor": "", "page_size": 1}, headers=headers)
+        second = self.client.get(
+            url,
+            {"cursor": first.json()["pagination"]["next_cursor"], "page_size": 1},
+            headers=headers,
+        )
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(first.json()["data"], second.json()["data"])
+
+
+class AsyncRootFormViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        cls.employee = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        cls.root_form = RootForm.objects.create(user=cls.employee, created_by=cls.employee)
+        service_details = ServiceDetails.objects.create(
+            root_form=cls.root_form,
+            joining_appointment_date=date(2015, 6, 1),
+            post_at_appointment=ServiceDetails.Post_Choices.REVENUE_CLERK,
+        )
+        ExamDetail.objects.create(service_details=service_details, exam_type="ccc")
+        RootForm.objects.create(user=cls.employee, created_by=cls.employee)
+
+    def setUp(self):
+        self.headers = {
+            "Authorization": f"Bearer {issue_refresh_token(self.admin).access_token}"
+        }
+        self.employee_headers = {
+            "Authorization": f"Bearer {issue_refresh_token(self.employee).access_token}"
+        }
+
+    async def assert_same_response(self, sync_url, async_url, params=None, headers=None):
+        headers = headers or self.headers
+        expected = await self.async_client.get(sync_url, params, headers=headers)
+        response = await self.async_client.get(async_url, params, headers=headers)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    async def test_list_matches_sync_view(self):
+        for params in ({}, {"page_size": 1, "page": 2}, {"cursor": "", "page_size": 1}):
+            await self.assert_same_response(
+                reverse("form:root-form-list"),
+                reverse("form:async-root-form-list"),
+                params,
+            )
+
+    async def test_list_requires_super_admin(self):
+        response = await self.assert_same_response(
+            reverse("form:root-form-list"),
+            reverse("form:async-root-form-list"),
+            headers=self.employee_headers,
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_accept_header_is_negotiated(self):
+        for accept in ("application/json; indent=4", "application/xml"):
+            response = await self.assert_same_response(
+                reverse("form:root-form-detail", args=[self.root_form.pk]),
+                reverse("form:async-root-form-detail", args=[self.root_form.pk]),
+                headers={**self.headers, "Accept": accept},
+            )
+            self.assertIn("Accept", response["Vary"])
+
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    async def test_unauthenticated_request_is_rejected(self):
+        response = await self.async_client.get(reverse("form:async-root-form-list"))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+    async def test_detail_matches_sync_view(self):
+        response = await self.assert_same_response(
+            reverse("form:root-form-detail", args=[self.root_form.pk]),
+            reverse("form:async-root-form-detail", args=[self.root_form.pk]),
+        )
+
+        not_modified = await self.async_client.get(
+            reverse("form:async-root-form-detail", args=[self.root_form.pk]),
+            headers={**self.headers, "If-None-Match": response["ETag"]},
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_missing_detail_is_not_found(self):
+        response = await self.async_client.get(
+            reverse("form:async-root-form-detail", args=["missing"]),
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class FormNumberTests(TestCase):
+    def setUp(self):
+        _reserved_blocks.clear()
+
+    def test_numbers_are_unique_and_consecutive(self):
+        user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        numbers = [
+            RootForm.objects.create(user=user, created_by=user).form_number
+            for _ in range(3)
+        ]
+
+        prefix = form_number_prefix()
+        first = FormNumberSequence.objects.get(prefix=prefix).last_value - 2
+        self.assertEqual(numbers, [f"{prefix}-{first + i}" for i in range(3)])
+
+    @override_settings(FORM_NUMBER_BLOCK_SIZE=5)
+    def test_block_is_served_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(next_form_sequence("FN-TEST"), 1)
+        with self.assertNumQueries(0):
+            served = [next_form_sequence("FN-TEST") for _ in range(4)]
+        self.assertEqual(served, [2, 3, 4, 5])
+
+        self.assertEqual(next_form_sequence("FN-TEST"), 6)
+        self.assertEqual(FormNumberSequence.objects.get(prefix="FN-TEST").last_value, 10)
+
+    @override_settings(FORM_NUMBER_BLOCK_SIZE=5)
+    def test_rolled_back_block_is_not_served(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            next_form_sequence("FN-TEST")
+            raise RuntimeError
+
+        self.assertEqual(_reserved_blocks, {})
+        self.assertEqual(next_form_sequence("FN-TEST"), 1)
+
+    def test_reservation_is_a_single_query(self):
+        self.assertEqual(reserve_form_numbers("FN-TEST", 3), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(reserve_form_numbers("FN-TEST", 2), 4)
+        self.assertEqual(FormNumberSequence.objects.get(prefix="FN-TEST").last_value, 5)
+
+    def test_rolled_back_reservation_is_handed_out_again(self):
+        reserve_form_numbers("FN-TEST")
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(reserve_form_numbers("FN-TEST", 3), 2)
+            raise RuntimeError
+
+        self.assertEqual(FormNumberSequence.objects.get(prefix="FN-TEST").last_value, 1)
+        self.assertEqual(reserve_form_numbers("FN-TEST"), 2)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        RootForm.objects.bulk_create(
+            [
+                RootForm(user=cls.admin, created_by=cls.admin, form_number=f"EMS-{i}")
+                for i in range(5)
+            ]
+        )
+        # Equal timestamps, so only the id breaks ties
+        RootForm.objects.update(created_at=now())
+
+    def setUp(self):
+        token = issue_refresh_token(self.admin).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.url = reverse("form:root-form-list")
+
+    def get_page(self, cursor="", page_size=2):
+        return self.client.get(
+            self.url, {"cursor": cursor, "page_size": page_size}, headers=self.headers
+        )
+
+    def test_next_pages_cover_every_row_once(self):
+        ids, cursor = [], ""
+        while cursor is not None:
+            body = self.get_page(cursor).json()
+            ids += [row["id"] for row in body["data"]]
+            cursor = body["pagination"]["next_cursor"]
+
+        expected = RootForm.objects.order_by("-created_at", "-id").values_list(
+            "id", flat=True
+        )
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.get_page().json()
+        second = self.get_page(first["pagination"]["next_cursor"]).json()
+
+        previous = self.get_page(second["pagination"]["previous_cursor"]).json()
+
+        self.assertEqual(previous["data"], first["data"])
+        self.assertFalse(previous["pagination"]["has_previous"])
+
+    def test_tampered_cursor_is_not_found(self):
+        position = f"0|{now().isoformat()}|not-a-uuid"
+        for cursor in ("%%%", urlsafe_b64encode(position.encode()).decode()):
+            response = self.get_page(cursor)
+
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json()["detail"], "Invalid cursor")
+
+
+class CountCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.queryset = RootForm.objects.filter(deleted_at__isnull=True)
+
+    def test_count_is_cached(self):
+        RootForm.objects.create(user=self.user, created_by=self.user)
+        self.assertEqual(get_exact_count(self.queryset), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_exact_count(self.queryset), 1)
+
+    def test_saving_a_form_invalidates_the_count(self):
+        form = RootForm.objects.create(user=self.user, created_by=self.user)
+        self.assertEqual(get_exact_count(self.queryset), 1)
+
+        RootForm.objects.create(user=self.user, created_by=self.user)
+        self.assertEqual(get_exact_count(self.queryset), 2)
+
+        form.delete()
+        self.assertEqual(get_exact_count(self.queryset), 1)
+
+    def test_queryset_soft_delete_invalidates_the_count(self):
+        form = RootForm.objects.create(user=self.user, created_by=self.user)
+        RootForm.objects.create(user=self.user, created_by=self.user)
+        self.assertEqual(get_exact_count(self.queryset), 2)
+
+        RootForm.objects.filter(pk=form.pk).delete()
+        self.assertEqual(get_exact_count(self.queryset), 1)
+
+        RootForm.all_objects.filter(pk=form.pk).update(deleted_at=None)
+        self.assertEqual(get_exact_count(self.queryset), 2)
+
+    def test_subquery_tables_are_part_of_the_key(self):
+        queryset = CustomUser.objects.with_latest_form_id().filter(
+            latest_form_id__isnull=False
+        )
+        self.assertEqual(get_queryset_tables(queryset), ["root_form", "users"])
+        self.assertEqual(get_exact_count(queryset), 0)
+
+        RootForm.objects.create(user=self.user, created_by=self.user)
+        self.assertEqual(get_exact_count(queryset), 1)
+
+    def test_bulk_writes_need_an_explicit_bump(self):
+        self.assertEqual(get_exact_count(self.queryset), 0)
+
+        # Bulk writes skip the signals, so the cached count is stale...
+        RootForm.objects.bulk_create(
+            [RootForm(user=self.user, created_by=self.user, form_number="EMS-BULK")]
+        )
+        self.assertEqual(get_exact_count(self.queryset), 0)
+
+        # ...until the table's generation is bumped
+        bump_table_generation(RootForm._meta.db_table)
+        self.assertEqual(get_exact_count(self.queryset), 1)
+
+    def test_process_local_cache_fails_deploy_check(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)], ["ems.W001"]
+        )
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache"}}
+    )
+    def test_shared_cache_passes_deploy_check(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class SearchDocumentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password", first_name="Asha"
+        )
+        cls.root_form = RootForm.objects.create(user=cls.user, created_by=cls.user)
+
+    def get_document(self):
+        self.root_form.refresh_from_db(fields=["search_document"])
+        return self.root_form.search_document
+
+    def capture_form_writes(self, save):
+        with CaptureQueriesContext(connection) as queries:
+            save()
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "root_form"')
+        ]
+
+    def test_new_form_document_has_user(self):
+        self.assertIn("asha", self.get_document())
+
+    def test_user_rename_updates_form_document(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.first_name = "Bhavna"
+
+        self.assertEqual(len(self.capture_form_writes(user.save)), 1)
+        self.assertIn("bhavna", self.get_document())
+        self.assertNotIn("asha", self.get_document())
+
+    def test_partial_user_save_updates_both_documents(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.first_name = "Bhavna"
+        user.save(update_fields=["first_name"])
+
+        user.refresh_from_db(fields=["search_document"])
+        self.assertIn("bhavna", user.search_document)
+        self.assertIn("bhavna", self.get_document())
+
+    def test_unrelated_user_saves_skip_forms(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.last_login = now()
+        self.assertEqual(
+            self.capture_form_writes(lambda: user.save(update_fields=["last_login"])),
+            [],
+        )
+
+        user.phone_number = "9999999999"
+        self.assertEqual(self.capture_form_writes(user.save), [])
+
+        # Saved through this instance, so the same name is not a change
+        self.assertEqual(self.capture_form_writes(user.save), [])
+
+    def test_personal_details_update_form_document(self):
+        PersonalDetails.objects.create(
+            root_form=self.root_form,
+            email="personal@example.com",
+            first_name="Chetna",
+            middle_name="Middle",
+            last_name="Last",
+            gender=PersonalDetails.Gender.FEMALE,
+            mobile_number="9999999999",
+            pan_number="ABCDE1234F",
+        )
+
+        self.assertIn("chetna", self.get_document())
+        self.assertIn("abcde1234f", self.get_document())
+
+    def test_saving_a_loaded_form_does_not_load_relations(self):
+        root_form = RootForm.objects.get(pk=self.root_form.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            root_form.save()
+
+        self.assertEqual(
+            [query["sql"].split()[0] for query in queries.captured_queries],
+            ["UPDATE"],
+        )
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        cls.forms = RootForm.objects.bulk_create(
+            [
+                RootForm(
+                    user=cls.admin,
+                    created_by=cls.admin,
+                    form_number=f"EMS-{day}",
+                    status=RootForm.Status.COMPLETED,
+                )
+                for day in (1, 2, 3)
+            ]
+        )
+        for day, root_form in enumerate(cls.forms, start=1):
+            RootForm.objects.filter(pk=root_form.pk).update(
+                created_at=make_aware(datetime(2024, 1, day, 12))
+            )
+        RootForm.objects.create(user=cls.admin, created_by=cls.admin)
+        PersonalDetails.objects.create(
+            root_form=cls.forms[0],
+            email="employee@example.com",
+            first_name="First",
+            middle_name="Middle",
+            last_name="Last",
+            gender=PersonalDetails.Gender.FEMALE,
+            mobile_number="9999999999",
+            pan_number="ABCDE1234F",
+        )
+
+    def setUp(self):
+        token = issue_refresh_token(self.admin).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def export(self, **params):
+        return self.client.get(
+            reverse("form:root-form-export"), params, headers=self.headers
+        )
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_streams_completed_forms(self):
+        response = self.export()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(
+            [row["form_number"] for row in rows], ["EMS-1", "EMS-2", "EMS-3"]
+        )
+        self.assertEqual(rows[0]["first_name"], "First")
+        self.assertEqual(rows[1]["first_name"], "")
+
+    def test_jsonl_keeps_nested_records(self):
+        response = self.export(file_format="jsonl")
+
+        records = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]["personal_details"]["pan_number"], "ABCDE1234F")
+        self.assertIsNone(records[1]["personal_details"])
+
+    def test_dates_bound_whole_days(self):
+        response = self.export(
+            file_format="jsonl", created_from="2024-01-02", created_to="2024-01-02"
+        )
+
+        records = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([record["form_number"] for record in records], ["EMS-2"])
+
+    def test_invalid_dates_are_rejected(self):
+        for value in ("yesterday", "2024-02-30"):
+            response = self.export(created_from=value)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json()["message"],
+                "created_from must be a date in YYYY-MM-DD format.",
+            )
+
+
+class StepBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        cls.employee = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        cls.other = CustomUser.objects.create_user(
+            email="other@example.com", password="password"
+        )
+        cls.own_form = RootForm.objects.create(
+            user=cls.employee, created_by=cls.employee
+        )
+        cls.foreign_form = RootForm.objects.create(
+            user=cls.other, created_by=cls.other
+        )
+
+    def submit(self, user, *items):
+        token = issue_refresh_token(user).access_token
+        return self.client.post(
+            reverse("form:root-form-steps-batch"),
+            {"items": list(items)},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    def personal_details(self, root_form, first_name="First"):
+        return {
+            "step": "personal_details",
+            "root_form_id": str(root_form.pk),
+            "data": {
+                "email": "employee@example.com",
+                "first_name": first_name,
+                "middle_name": "Middle",
+                "last_name": "Last",
+                "gender": PersonalDetails.Gender.FEMALE,
+                "mobile_number": "9999999999",
+                "pan_number": "ABCDE1234F",
+                "is_step_completed": True,
+            },
+        }
+
+    def test_super_admin_saves_any_users_form(self):
+        response = self.submit(self.admin, self.personal_details(self.foreign_form))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"][0]["status"], "created")
+        self.foreign_form.refresh_from_db()
+        self.assertEqual(self.foreign_form.step_completed, [FormStep.PERSONAL_DETAILS])
+
+    def test_employee_cannot_save_foreign_form(self):
+        response = self.submit(
+            self.employee,
+            self.personal_details(self.own_form),
+            self.personal_details(self.foreign_form),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["data"]],
+            ["created", "error"],
+        )
+        self.assertEqual(
+            response.json()["errors"], {"1": {"root_form_id": ["Form not found."]}}
+        )
+        self.assertFalse(
+            PersonalDetails.all_objects.filter(root_form=self.foreign_form).exists()
+        )
+
+    def service_details(self, root_form):
+        return {
+            "step": "service_details",
+            "root_form_id": str(root_form.pk),
+            "data": {
+                "joining_appointment_date": "2015-06-01",
+                "post_at_appointment": ServiceDetails.Post_Choices.REVENUE_CLERK,
+                "exams": [{"exam_type": "ccc"}],
+                "is_step_completed": True,
+            },
+        }
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        forms = RootForm.objects.bulk_create(
+            [
+                RootForm(
+                    user=self.employee, created_by=self.employee, form_number=f"EMS-{i}"
+                )
+                for i in range(50)
+            ]
+        )
+        items = [self.personal_details(form) for form in forms]
+        items += [self.service_details(form) for form in forms]
+        # Authenticated once up front, so only the batch itself is counted
+        self.submit(self.employee, self.personal_details(self.own_form))
+
+        token = issue_refresh_token(self.employee).access_token
+        # One query each for the forms, both step tables and the exams, the
+        # inserts, the step transition and the search documents, plus the
+        # savepoints around them
+        with self.assertNumQueries(17):
+            response = self.client.post(
+                reverse("form:root-form-steps-batch"),
+                {"items": items},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["data"]],
+            ["created"] * 100,
+        )
+
+    def test_duplicate_step_is_rejected(self):
+        response = self.submit(
+            self.employee,
+            self.personal_details(self.own_form),
+            self.personal_details(self.own_form, first_name="Again"),
+        )
+
+        self.assertEqual(
+            response.json()["errors"],
+            {"1": {"non_field_errors": ["Duplicate step for this form in the batch."]}},
+        )
+        self.assertEqual(
+            PersonalDetails.objects.get(root_form=self.own_form).first_name, "First"
+        )
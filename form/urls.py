@@ -1,4 +1,7 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+
+from . import async_views
 from .views import (
     RootFormViewSet,
     PersonalDetailsViewSet,
@@ -12,5 +15,8 @@ router.register(r"personal-details", PersonalDetailsViewSet, basename="personal-
 router.register(r"service-details", ServiceDetailsViewSet, basename="service-details")
 router.register(r"", RootFormViewSet, basename="root-form")
 
-urlpatterns = []
+urlpatterns = [
+    path("async/", async_views.root_form_list, name="async-root-form-list"),
+    path("async/<str:pk>/", async_views.root_form_detail, name="async-root-form-detail"),
+]
 urlpatterns += router.urls
\ No newline at end of file
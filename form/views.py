@@ -1,21 +1,36 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Prefetch, Q
 from django.db.transaction import atomic
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from user.authentication import CustomUserIsAuthenticated
 
+from services.conditional import (
+    check_preconditions,
+    get_last_modified,
+    make_etag,
+    set_validators,
+)
 from services.pagination import CustomPagination
+from services.search import DocumentSearchFilter
 from services.utils import get_response
 from services.permissions import allow_permission
 from user.enums import UserRoleEnum
 
-from .models import RootForm, PersonalDetails, ServiceDetails
+from .batch import MAX_BATCH_SIZE, StepBatch
+from .exports import get_export_queryset, stream_csv, stream_jsonl
+from .models import ExamDetail, RootForm, PersonalDetails, ServiceDetails
 from .serializer import (
     RootFormSerializer,
     RootFormDetailSerializer,
     RootFormListSerializer,
     PersonalDetailsSerializer,
     ServiceDetailsSerializer,
+    root_form_list_projection,
 )
 
 
@@ -24,7 +39,7 @@ class RootFormViewSet(viewsets.ModelViewSet):
     serializer_class = RootFormSerializer
     permission_classes = [CustomUserIsAuthenticated]
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, DocumentSearchFilter, OrderingFilter]
     search_fields = [
         "form_number",
         "user__email",
@@ -32,6 +47,18 @@ class RootFormViewSet(viewsets.ModelViewSet):
         "user__last_name",
     ]
     filterset_fields = ["status"]
+    detail_actions = ("retrieve", "create", "update", "partial_update")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.detail_actions:
+            # Everything RootFormDetailSerializer touches, in two queries
+            queryset = queryset.select_related(
+                "personal_details", "service_details"
+            ).prefetch_related(
+                Prefetch("service_details__exams", queryset=ExamDetail.objects.all())
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -49,7 +76,7 @@ class RootFormViewSet(viewsets.ModelViewSet):
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            obj = serializer.save()
+            obj = self.get_queryset().get(pk=serializer.save().pk)
             return get_response(
                 is_success=True,
                 message="Root form created successfully",
@@ -63,8 +90,73 @@ class RootFormViewSet(viewsets.ModelViewSet):
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
+    def get_validators_queryset(self):
+        return (
+            RootForm.objects.filter(pk=self.kwargs[self.lookup_field])
+            .values(
+                "pk",
+                "updated_at",
+                "personal_details__updated_at",
+                "service_details__updated_at",
+            )
+            .annotate(
+                exams_updated_at=Max("service_details__exams__updated_at"),
+                exams=Count(
+                    "service_details__exams",
+                    filter=Q(service_details__exams__deleted_at__isnull=True),
+                ),
+            )
+            .order_by()
+        )
+
+    def get_validators(self):
+        """ETag and Last-Modified of the detail payload, from the
+        ``updated_at`` of the form and its steps in one query"""
+        try:
+            row = self.get_validators_queryset().first()
+        except (ValueError, ValidationError):
+            row = None
+        return self.build_validators(row)
+
+    async def aget_validators(self):
+        try:
+            row = await self.get_validators_queryset().afirst()
+        except (ValueError, ValidationError):
+            row = None
+        return self.build_validators(row)
+
+    def build_validators(self, row):
+        if row is None:
+            raise Http404
+        etag = make_etag(*row.values())
+        last_modified = get_last_modified(
+            row["updated_at"],
+            row["personal_details__updated_at"],
+            row["service_details__updated_at"],
+            row["exams_updated_at"],
+        )
+        return etag, last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = check_preconditions(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    @atomic
+    def update(self, request, *args, **kwargs):
+        response = check_preconditions(request, *self.get_validators())
+        if response is not None:
+            return response
+        return super().update(request, *args, **kwargs)
+
     @atomic
     def partial_update(self, request, *args, **kwargs):
+        response = check_preconditions(request, *self.get_validators())
+        if response is not None:
+            return response
+
         obj = self.get_object()
         serializer = self.get_serializer(data=request.data, partial=True, instance=obj)
         if serializer.is_valid():
@@ -82,35 +174,115 @@ class RootFormViewSet(viewsets.ModelViewSet):
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
-    @allow_permission([UserRoleEnum.SUPER_ADMIN])
-    def list(self, request, *args, **kwargs):
+    def get_list_queryset(self):
+        """Filtered ``values()`` rows, rendered by ``root_form_list_projection``"""
         queryset = self.get_queryset()
         filters = {
-            "status__in": request.GET.getlist("status[]"),
+            "status__in": self.request.GET.getlist("status[]"),
         }
         for field, values in filters.items():
             if values:
                 queryset = queryset.filter(**{field: values})
 
-        queryset = self.filter_queryset(queryset)
+        return root_form_list_projection.values(self.filter_queryset(queryset))
+
+    @allow_permission([UserRoleEnum.SUPER_ADMIN])
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
 
         paginator = CustomPagination()
         page = paginator.paginate_queryset(queryset, request)
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
             return paginator.get_paginated_response(
-                serializer.data, message="Form list fetched successfully"
+                root_form_list_projection.render(page),
+                message="Form list fetched successfully",
             )
 
-        serializer = self.get_serializer(queryset, many=True)
         return get_response(
             is_success=True,
             message="Root form list fetched successfully",
-            data=serializer.data,
+            data=root_form_list_projection.render(queryset),
             status_code=status.HTTP_200_OK,
         )
 
+    @action(detail=False, methods=["get"], url_path="export", url_name="export")
+    @allow_permission([UserRoleEnum.SUPER_ADMIN])
+    def export(self, request):
+        # ``format`` is taken by DRF's renderer negotiation.
+        file_format = request.GET.get("file_format", "csv")
+        if file_format not in ("csv", "jsonl"):
+            return get_response(
+                is_success=False,
+                message="Unsupported file format, use csv or jsonl.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        dates = {}
+        for param in ("created_from", "created_to"):
+            value = request.GET.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                # Well formed but not a real day, e.g. 2024-02-30
+                dates[param] = None
+            if value and dates[param] is None:
+                return get_response(
+                    is_success=False,
+                    message=f"{param} must be a date in YYYY-MM-DD format.",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                )
+
+        statuses = request.GET.getlist("status[]") or [RootForm.Status.COMPLETED]
+        queryset = get_export_queryset(statuses=statuses, **dates)
+
+        if file_format == "csv":
+            response = StreamingHttpResponse(
+                stream_csv(queryset), content_type="text/csv"
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_jsonl(queryset), content_type="application/x-ndjson"
+            )
+        response["Content-Disposition"] = (
+            f'attachment; filename="forms.{file_format}"'
+        )
+        return response
+
+    @action(detail=False, methods=["post"], url_path="steps/batch", url_name="steps-batch")
+    def submit_steps(self, request):
+        items = request.data.get("items") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return get_response(
+                is_success=False,
+                message="items must be a non-empty list.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > MAX_BATCH_SIZE:
+            return get_response(
+                is_success=False,
+                message=f"A batch can hold at most {MAX_BATCH_SIZE} items.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = StepBatch(items, request.user).save()
+        failed = [result for result in results if result["status"] == "error"]
+        return get_response(
+            is_success=not failed,
+            message=(
+                "Steps saved successfully"
+                if not failed
+                else f"{len(failed)} of {len(results)} steps failed"
+            ),
+            data=results,
+            errors={result["index"]: result["errors"] for result in failed} or None,
+            status_code=(
+                status.HTTP_400_BAD_REQUEST
+                if len(failed) == len(results)
+                else status.HTTP_200_OK
+            ),
+        )
+
 
 class PersonalDetailsViewSet(viewsets.ModelViewSet):
     queryset = PersonalDetails.objects.all()
@@ -0,0 +1,109 @@
+from functools import wraps
+
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_http_methods
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAcceptable,
+    NotAuthenticated,
+)
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from services.permissions import check_role
+from user.authentication import ClaimsJWTAuthentication, aauthenticate_claims
+
+
+def get_view(viewset_class, request, action, **kwargs):
+    """A viewset instance set up as DRF's dispatch would, so async views can
+    reuse its querysets, filter backends and serializer context"""
+    return viewset_class(
+        request=request, action=action, format_kwarg=None, args=(), kwargs=kwargs
+    )
+
+
+def get_renderers():
+    # The browsable API renders through an ``APIView``, which these views lack
+    return [
+        renderer_class()
+        for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES
+        if not issubclass(renderer_class, BrowsableAPIRenderer)
+    ]
+
+
+def negotiate(request, force=False):
+    """Set the renderer DRF's content negotiation picks from ``Accept``.
+
+    Raises ``NotAcceptable`` as ``APIView`` does, unless ``force``, which
+    falls back to the first renderer for error responses.
+    """
+    renderers = get_renderers()
+    negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+    try:
+        renderer, media_type = negotiator.select_renderer(request, renderers)
+    except NotAcceptable:
+        if not force:
+            raise
+        renderer, media_type = renderers[0], renderers[0].media_type
+    request.accepted_renderer, request.accepted_media_type = renderer, media_type
+
+
+def render_response(request, response):
+    """Render a DRF ``Response`` returned from outside ``APIView`` with the
+    renderer negotiated for ``request``"""
+    if isinstance(response, Response):
+        if not hasattr(request, "accepted_renderer"):
+            negotiate(request, force=True)
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = {"request": request, "response": response}
+        patch_vary_headers(response, ["Accept"])
+        response.render()
+    return response
+
+
+def handle_exception(request, exc):
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        exc.auth_header = ClaimsJWTAuthentication().authenticate_header(request)
+    response = exception_handler(exc, {})
+    if response is None:
+        raise exc
+    return response
+
+
+def async_api_view(allowed_roles=None, methods=("GET", "HEAD"), public=False):
+    """Serve an async view with the API's authentication, permission checks
+    and error responses, without DRF's synchronous dispatch.
+
+    The view receives a DRF ``Request`` whose user is a ``ClaimsUser``, or
+    is left anonymous for ``public`` views such as login, and may return a
+    DRF ``Response``, which is rendered in the format the ``Accept`` header
+    negotiates, as on the sync views.
+    """
+
+    def decorator(view_func):
+        @require_http_methods(list(methods))
+        @wraps(view_func)
+        async def wrapped_view(request, *args, **kwargs):
+            request = Request(request)
+            try:
+                negotiate(request)
+                if not public:
+                    request.user, request.auth = await aauthenticate_claims(request)
+                if allowed_roles:
+                    if not request.auth.get("user_role"):
+                        await request.user.aload_instance()
+                    check_role(request.user, allowed_roles)
+                response = await view_func(request, *args, **kwargs)
+            except (APIException, Http404) as exc:
+                response = handle_exception(request, exc)
+            return render_response(request, response)
+
+        return wrapped_view
+
+    return decorator
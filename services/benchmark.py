@@ -0,0 +1,64 @@
+import json
+from math import ceil
+from statistics import median
+
+# Timed requests an endpoint needs before its p95 budget is enforced
+MIN_LATENCY_SAMPLES = 100
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (``pct`` between 0 and 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings):
+    """p50/p95/p99/max in milliseconds for a list of durations in seconds"""
+    return {
+        "count": len(timings),
+        "p50_ms": round(median(timings) * 1000, 2) if timings else 0.0,
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        "p99_ms": round(percentile(timings, 99) * 1000, 2),
+        "max_ms": round(max(timings, default=0.0) * 1000, 2),
+    }
+
+
+def format_summary(label, summary):
+    return (
+        f"{label:<40} n={summary['count']:<5} p50={summary['p50_ms']:>8.2f}ms "
+        f"p95={summary['p95_ms']:>8.2f}ms p99={summary['p99_ms']:>8.2f}ms "
+        f"max={summary['max_ms']:>8.2f}ms"
+    )
+
+
+def load_budgets(path):
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+def check_budgets(results, budgets):
+    """Split the budget overruns in ``results`` into failures and warnings.
+
+    Both map an endpoint label to ``{"queries": n, "p95_ms": n}``; endpoints
+    without a budget are not checked. Query counts always fail; a p95 over
+    fewer than ``MIN_LATENCY_SAMPLES`` requests is close to the maximum, so
+    it is only a warning.
+    """
+    failures, warnings = [], []
+    for label, result in results.items():
+        budget = budgets.get(label)
+        if not budget:
+            continue
+        for metric in ("queries", "p95_ms"):
+            if metric in budget and result[metric] > budget[metric]:
+                overrun = (
+                    f"{label}: {metric} {result[metric]} over budget {budget[metric]}"
+                )
+                if metric == "p95_ms" and result["count"] < MIN_LATENCY_SAMPLES:
+                    warnings.append(overrun)
+                else:
+                    failures.append(overrun)
+    return failures, warnings
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends whose entries, and so whose invalidations, stay in one process
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_process_local(alias="default"):
+    return isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Invalidations written to a process-local cache never reach the other
+    workers, which then serve stale counts and users until the timeout."""
+    aliases = {"default", getattr(settings, "PROFILE_CACHE_ALIAS", "default")}
+    return [
+        checks.Warning(
+            f"The '{alias}' cache is local to each process.",
+            hint="Set CACHE_URL to a cache shared by every worker, such as Redis.",
+            id="ems.W001",
+        )
+        for alias in sorted(aliases)
+        if is_process_local(alias)
+    ]
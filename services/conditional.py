@@ -0,0 +1,29 @@
+from hashlib import sha256
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def get_last_modified(*timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp]
+    return int(max(timestamps).timestamp()) if timestamps else None
+
+
+def check_preconditions(request, etag, last_modified=None):
+    """``304``/``412`` response when the request's conditional headers say so.
+
+    Covers ``If-None-Match``/``If-Modified-Since`` on reads and
+    ``If-Match``/``If-Unmodified-Since`` on writes; ``None`` means carry on.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
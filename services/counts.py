@@ -0,0 +1,147 @@
+import json
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.sql import Query
+
+
+def get_count_cache_timeout():
+    return getattr(settings, "PAGINATION_COUNT_CACHE_TIMEOUT", 30)
+
+
+def get_estimate_threshold():
+    return getattr(settings, "PAGINATION_ESTIMATE_THRESHOLD", 100_000)
+
+
+def table_generation_key(table):
+    return f"count-generation:{table}"
+
+
+def bump_table_generation(*tables):
+    """Invalidate every cached count that reads from one of ``tables``"""
+    for table in tables:
+        key = table_generation_key(table)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def collect_query_tables(query, tables):
+    if query.model is not None:
+        tables.add(query.model._meta.db_table)
+    tables.update(join.table_name for join in query.alias_map.values())
+    for combined in query.combined_queries:
+        collect_query_tables(combined, tables)
+    for expression in (query.where, *query.annotations.values()):
+        collect_expression_tables(expression, tables)
+
+
+def collect_expression_tables(expression, tables):
+    # Subqueries, e.g. ``Subquery``, ``Exists`` or ``pk__in=queryset``, are
+    # ``Query`` objects somewhere under the where clause or an annotation
+    for source in expression.get_source_expressions():
+        if isinstance(source, Query):
+            collect_query_tables(source, tables)
+        elif source is not None:
+            collect_expression_tables(source, tables)
+
+
+def get_queryset_tables(queryset):
+    """Every table ``queryset`` reads from, its subqueries included"""
+    tables = set()
+    collect_query_tables(queryset.query, tables)
+    return sorted(tables)
+
+
+def build_count_cache_key(queryset, generations):
+    sql, params = queryset.query.sql_with_params()
+    signature = repr((queryset.db, sql, params, sorted(generations.items())))
+    return f"count:{sha256(signature.encode()).hexdigest()}"
+
+
+def get_generation_keys(queryset):
+    return [table_generation_key(table) for table in get_queryset_tables(queryset)]
+
+
+def get_count_cache_key(queryset):
+    generations = cache.get_many(get_generation_keys(queryset))
+    return build_count_cache_key(queryset, generations)
+
+
+async def aget_count_cache_key(queryset):
+    generations = await cache.aget_many(get_generation_keys(queryset))
+    return build_count_cache_key(queryset, generations)
+
+
+def get_exact_count(queryset):
+    cache_key = get_count_cache_key(queryset)
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout=get_count_cache_timeout())
+    return count
+
+
+async def aget_exact_count(queryset):
+    cache_key = await aget_count_cache_key(queryset)
+    count = await cache.aget(cache_key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(cache_key, count, timeout=get_count_cache_timeout())
+    return count
+
+
+def is_estimable(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def parse_estimate(plan):
+    return int(json.loads(plan)[0]["Plan"]["Plan Rows"])
+
+
+def get_estimated_count(queryset):
+    """Row estimate from the Postgres planner, ``None`` on other backends"""
+    if not is_estimable(queryset):
+        return None
+    return parse_estimate(queryset.order_by().explain(format="json"))
+
+
+async def aget_estimated_count(queryset):
+    if not is_estimable(queryset):
+        return None
+    return parse_estimate(await queryset.order_by().aexplain(format="json"))
+
+
+def get_count(object_list, allow_estimate=False):
+    """Return ``(count, is_exact)`` for a list page.
+
+    Large unfiltered lists are counted from the planner estimate, everything
+    else gets an exact count cached until the TTL runs out or a table it
+    reads from is written to.
+    """
+    if not isinstance(object_list, QuerySet):
+        return len(object_list), True
+
+    if allow_estimate:
+        estimate = get_estimated_count(object_list)
+        if estimate is not None and estimate >= get_estimate_threshold():
+            return estimate, False
+
+    return get_exact_count(object_list), True
+
+
+async def aget_count(object_list, allow_estimate=False):
+    """``get_count`` on the async ORM and cache API"""
+    if not isinstance(object_list, QuerySet):
+        return len(object_list), True
+
+    if allow_estimate:
+        estimate = await aget_estimated_count(object_list)
+        if estimate is not None and estimate >= get_estimate_threshold():
+            return estimate, False
+
+    return await aget_exact_count(object_list), True
@@ -0,0 +1,115 @@
+from bisect import bisect_left
+from secrets import compare_digest
+from threading import Lock, local
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds in seconds, Prometheus' default buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HISTOGRAMS = {
+    "ems_request_duration_seconds": "Wall time spent in the view, per route.",
+    "ems_request_db_seconds": "Time spent executing SQL, per route.",
+    "ems_request_serializer_seconds": "Time spent building serializer data, per route.",
+}
+COUNTERS = {
+    "ems_request_db_queries_total": "SQL queries executed, per route.",
+    "ems_profile_cache_requests_total": "/me profile cache lookups, by result.",
+}
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Histograms and counters aggregated per thread without locking.
+
+    Every worker thread writes only to its own store; the lock is taken once
+    per thread to register the store and when a scrape walks them. Readers may
+    see a sample half-recorded, which Prometheus tolerates. Each process keeps
+    its own registry, so scrape every worker.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.local = local()
+        self.stores = []
+        self.lock = Lock()
+
+    def get_store(self):
+        store = getattr(self.local, "store", None)
+        if store is None:
+            store = self.local.store = {"histograms": {}, "counters": {}}
+            with self.lock:
+                self.stores.append(store)
+        return store
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histograms = self.get_store()["histograms"]
+        histogram = histograms.get(key)
+        if histogram is None:
+            # bucket counts (last one is +Inf), sum
+            histogram = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        histogram[0][bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        counters = self.get_store()["counters"]
+        counters[key] = counters.get(key, 0) + amount
+
+    def collect(self):
+        histograms, counters = {}, {}
+        with self.lock:
+            stores = list(self.stores)
+        for store in stores:
+            for key, (counts, total) in list(store["histograms"].items()):
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+            for key, value in list(store["counters"].items()):
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self):
+        """The registry in the Prometheus text exposition format"""
+        histograms, counters = self.collect()
+        lines = []
+        for name, help_text in HISTOGRAMS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (metric, labels), (counts, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{format_labels(labels, le=bound)} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        for name, help_text in COUNTERS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    # Closed until a token is configured
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token or not compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
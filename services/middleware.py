@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+
+from services.metrics import registry
+
+current_timing = ContextVar("current_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.db_time = 0.0
+        self.queries = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+def time_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_time += perf_counter() - start
+        timing.queries += 1
+
+
+def add_query_timing(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def install_query_timing():
+    """Keep ``time_query`` on every connection for good.
+
+    Connections are per thread and async views run their queries in
+    ``sync_to_async`` threads, so a wrapper added around the request would
+    miss them; the context variable does follow the request there.
+    """
+    connection_created.connect(add_query_timing, dispatch_uid="time_query")
+    for connection in connections.all(initialized_only=True):
+        add_query_timing(connection)
+
+
+def install_serializer_timing():
+    """Wrap ``BaseSerializer.data`` so serialization time is added to the
+    current request. Only the outermost call is counted."""
+    data = BaseSerializer.data
+    if getattr(data.fget, "timed", False):
+        return
+
+    def timed_data(serializer):
+        timing = current_timing.get()
+        if timing is None:
+            return data.fget(serializer)
+        timing.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timing.serializer_depth -= 1
+            if not timing.serializer_depth:
+                timing.serializer_time += perf_counter() - start
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class PerformanceMiddleware:
+    """Time each request's view, SQL and serializers.
+
+    The breakdown goes into the per-route histograms served by
+    ``services.metrics.metrics_view``. Serializers are only timed when
+    SERIALIZER_TIMING_ENABLED, and the ``Server-Timing`` header, which any
+    client can read, is only sent when SERVER_TIMING_ENABLED.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.time_serializers = settings.SERIALIZER_TIMING_ENABLED
+        self.send_header = settings.SERVER_TIMING_ENABLED
+        install_query_timing()
+        if self.time_serializers:
+            install_serializer_timing()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.measure(request) as finish:
+            response = self.get_response(request)
+        return finish(response)
+
+    async def __acall__(self, request):
+        with self.measure(request) as finish:
+            response = await self.get_response(request)
+        return finish(response)
+
+    @contextmanager
+    def measure(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        start = perf_counter()
+        try:
+            yield lambda response: self.record(request, response, timing, start)
+        finally:
+            current_timing.reset(token)
+
+    def record(self, request, response, timing, start):
+        total = perf_counter() - start
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else "unmatched"
+
+        registry.observe("ems_request_duration_seconds", total, route=route)
+        registry.observe("ems_request_db_seconds", timing.db_time, route=route)
+        if self.time_serializers:
+            registry.observe(
+                "ems_request_serializer_seconds", timing.serializer_time, route=route
+            )
+        registry.increment("ems_request_db_queries_total", timing.queries, route=route)
+
+        if self.send_header:
+            metrics = [
+                f'db;dur={timing.db_time * 1000:.2f};desc="{timing.queries} queries"'
+            ]
+            if self.time_serializers:
+                metrics.append(f"serializer;dur={timing.serializer_time * 1000:.2f}")
+            metrics.append(f"total;dur={total * 1000:.2f}")
+            response["Server-Timing"] = ", ".join(metrics)
+        return response
@@ -16,6 +16,8 @@ from django.db.models import (
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from services.counts import bump_table_generation
+
 
 class BaseCoreModel(Model):
     id = UUIDField(default=uuid4, primary_key=True, editable=False, verbose_name=_("Id"))
@@ -30,7 +32,28 @@ class BaseCoreModel(Model):
         ]
 
 
-class SoftDeletionQuerySet(QuerySet):
+class InvalidatingQuerySet(QuerySet):
+    """Bulk ``update()`` and ``delete()`` skip the model signals, so they bump
+    the table's count generation themselves"""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_table_generation(self.model._meta.db_table)
+        return rows
+
+    def delete(self):
+        deleted, per_model = super().delete()
+        if deleted:
+            bump_table_generation(self.model._meta.db_table)
+        return deleted, per_model
+
+
+class InvalidatingManager(Manager.from_queryset(InvalidatingQuerySet)):
+    pass
+
+
+class SoftDeletionQuerySet(InvalidatingQuerySet):
     def delete(self, soft=True):
         if soft:
             return self.update(deleted_at=now())
@@ -48,7 +71,7 @@ class SoftDeleteModel(BaseCoreModel):
 
     deleted_at = DateTimeField(verbose_name="Deleted At", null=True, blank=True)
 
-    all_objects = Manager()
+    all_objects = InvalidatingManager()
     objects = SoftDeletionManager()
 
     class Meta(BaseCoreModel.Meta):
@@ -0,0 +1,169 @@
+import logging
+import re
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+current_tracker = ContextVar("current_tracker", default=None)
+
+LITERAL_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+IGNORED_STATEMENTS = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO)", re.I)
+STACK_DEPTH = 8
+# Query wrappers that would otherwise show up in every reported stack
+INSTRUMENTATION_MODULES = ("middleware.py", "nplusone.py")
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """``sql`` with literals, placeholders and IN lists collapsed"""
+    for pattern, replacement in LITERAL_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def get_project_stack():
+    base_dir = str(Path(settings.BASE_DIR))
+    instrumentation = {
+        str(Path(base_dir, "services", name)) for name in INSTRUMENTATION_MODULES
+    }
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and frame.filename not in instrumentation
+    ]
+    return "".join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+class QueryTracker:
+    def __init__(self, label, threshold, allowlist):
+        self.label = label
+        self.threshold = threshold
+        self.allowlist = [re.compile(pattern) for pattern in allowlist]
+        self.counts = {}
+        self.first_stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not IGNORED_STATEMENTS.match(sql):
+            key = fingerprint(sql)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            if key not in self.first_stacks:
+                self.first_stacks[key] = get_project_stack()
+        return execute(sql, params, many, context)
+
+    def is_allowed(self, key):
+        return any(
+            pattern.search(key) or pattern.search(self.label)
+            for pattern in self.allowlist
+        )
+
+    def get_offenders(self):
+        return [
+            (key, count)
+            for key, count in self.counts.items()
+            if count > self.threshold and not self.is_allowed(key)
+        ]
+
+    def report(self):
+        offenders = self.get_offenders()
+        if not offenders:
+            return None
+        return "\n\n".join(
+            f"N+1 in {self.label}: query ran {count} times "
+            f"(threshold {self.threshold})\n  {key}\nFirst run from:\n"
+            f"{self.first_stacks[key]}"
+            for key, count in offenders
+        )
+
+
+def track_query(execute, sql, params, many, context):
+    tracker = current_tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+    return tracker(execute, sql, params, many, context)
+
+
+def add_query_tracking(connection, **kwargs):
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+def install_query_tracking():
+    connection_created.connect(add_query_tracking, dispatch_uid="track_query")
+    for connection in connections.all(initialized_only=True):
+        add_query_tracking(connection)
+
+
+@contextmanager
+def detect_nplusone(label, threshold=None, allowlist=None, raise_error=None):
+    """Report queries repeated more than ``threshold`` times inside the block"""
+    install_query_tracking()
+    tracker = QueryTracker(
+        label,
+        settings.NPLUSONE_THRESHOLD if threshold is None else threshold,
+        settings.NPLUSONE_ALLOWLIST if allowlist is None else allowlist,
+    )
+    token = current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        current_tracker.reset(token)
+
+    report = tracker.report()
+    if report:
+        if settings.NPLUSONE_RAISE if raise_error is None else raise_error:
+            raise NPlusOneError(report)
+        logger.warning(report)
+
+
+class NPlusOneMiddleware:
+    """Run every request under ``detect_nplusone`` when NPLUSONE_ENABLED"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def get_label(self, request):
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        return f"{request.method} {request.path} ({view})"
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with detect_nplusone(request.path) as tracker:
+            response = self.get_response(request)
+            tracker.label = self.get_label(request)
+        return response
+
+    async def __acall__(self, request):
+        with detect_nplusone(request.path) as tracker:
+            response = await self.get_response(request)
+            tracker.label = self.get_label(request)
+        return response
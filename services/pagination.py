@@ -1,6 +1,32 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import partial
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from math import ceil
+from uuid import UUID
+
+from services.counts import aget_count, get_count
+
+
+class CountStrategyPaginator(Paginator):
+    def __init__(self, *args, allow_estimate=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.allow_estimate = allow_estimate
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = get_count(
+            self.object_list, allow_estimate=self.allow_estimate
+        )
+        return count
 
 
 class CustomPagination(PageNumberPagination):
@@ -8,7 +34,143 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 100
 
+    # Passing ``?cursor=`` (empty for the first page) switches to keyset
+    # pagination on ``(created_at, id)``, which skips OFFSET and COUNT(*).
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            self.django_paginator_class = partial(
+                CountStrategyPaginator,
+                allow_estimate=self.allow_estimate(request),
+            )
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        queryset = self.get_cursor_queryset(queryset, cursor)
+        return self.set_cursor_page(list(queryset[: page_size + 1]), page_size, cursor)
+
+    async def apaginate_queryset(self, queryset, request):
+        """``paginate_queryset`` on the async ORM, for async views"""
+        self.request = request
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        page_size = self.get_page_size(request)
+        if self.cursor_mode:
+            cursor = self.decode_cursor(request)
+            queryset = self.get_cursor_queryset(queryset, cursor)
+            rows = [row async for row in queryset[: page_size + 1]]
+            return self.set_cursor_page(rows, page_size, cursor)
+        if not page_size:
+            return None
+
+        paginator = CountStrategyPaginator(queryset, page_size)
+        # Filled in ahead, so the paginator never counts synchronously
+        paginator.count, paginator.count_is_exact = await aget_count(
+            queryset, allow_estimate=self.allow_estimate(request)
+        )
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            )
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom : bottom + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
+
+    def allow_estimate(self, request):
+        # Only lists without search/filter params may use planner estimates.
+        pagination_params = {self.page_query_param, self.page_size_query_param}
+        return not set(request.query_params) - pagination_params
+
+    def get_cursor_queryset(self, queryset, cursor):
+        if cursor and cursor[0]:
+            _, created_at, pk = cursor
+            return queryset.order_by("created_at", "id").filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            )
+        queryset = queryset.order_by("-created_at", "-id")
+        if cursor:
+            _, created_at, pk = cursor
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        return queryset
+
+    def set_cursor_page(self, results, page_size, cursor):
+        reverse = bool(cursor and cursor[0])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page_rows = results
+        return results
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            decoded = urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            reverse, created_at, pk = decoded.split("|")
+            created_at = parse_datetime(created_at)
+            pk = UUID(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None or reverse not in ("0", "1"):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse == "1", created_at, pk
+
+    def encode_cursor(self, obj, reverse=False):
+        # Model instances, or values() rows from list projections
+        if isinstance(obj, dict):
+            created_at, pk = obj["created_at"], obj["id"]
+        else:
+            created_at, pk = obj.created_at, obj.pk
+        position = f"{int(reverse)}|{created_at.isoformat()}|{pk}"
+        return urlsafe_b64encode(position.encode("ascii")).decode("ascii")
+
+    def get_cursor_paginated_response(self, data, message=None):
+        rows = self.page_rows
+        next_cursor = self.encode_cursor(rows[-1]) if rows and self.has_next else None
+        previous_cursor = (
+            self.encode_cursor(rows[0], reverse=True)
+            if rows and self.has_previous
+            else None
+        )
+
+        return Response(
+            {
+                "is_success": True,
+                "message": message,
+                "pagination": {
+                    "page_size": self.get_page_size(self.request),
+                    "next_cursor": next_cursor,
+                    "previous_cursor": previous_cursor,
+                    "has_next": self.has_next,
+                    "has_previous": self.has_previous,
+                },
+                "data": data,
+            }
+        )
+
     def get_paginated_response(self, data, message=None):
+        if self.cursor_mode:
+            return self.get_cursor_paginated_response(data, message=message)
+
         total = self.page.paginator.count
         page_size = self.get_page_size(self.request)
         total_pages = ceil(total / page_size)
@@ -22,6 +184,7 @@ class CustomPagination(PageNumberPagination):
                     "page_size": page_size,
                     "total_items": total,
                     "total_pages": total_pages,
+                    "total_is_exact": self.page.paginator.count_is_exact,
                     "has_next": self.page.has_next(),
                     "has_previous": self.page.has_previous(),
                 },
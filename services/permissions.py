@@ -3,29 +3,34 @@ from functools import wraps
 from user.enums import UserRoleEnum
 
 
-def allow_permission(allowed_roles: list[UserRoleEnum]):
-    def decorator(view_func):
-        @wraps(view_func)
-        def _wrapped_view(self, request, *args, **kwargs):
-            user = request.user
+def has_role(user, allowed_roles):
+    """Whether the authenticated ``user`` has one of ``allowed_roles``"""
+    if getattr(user, "is_super_admin", False):
+        return True
+
+    user_role = getattr(user, "user_role", None)
 
-            if not user or not user.is_authenticated:
-                raise PermissionDenied("Authentication required.")
+    allowed_values = [
+        role.value if hasattr(role, "value") else role for role in allowed_roles
+    ]
 
-            if getattr(user, "is_super_admin", False):
-                return view_func(self, request, *args, **kwargs)
+    return user_role in allowed_values
 
-            user_role = getattr(user, "user_role", None)
 
-            allowed_values = [
-                role.value if hasattr(role, "value") else role for role in allowed_roles
-            ]
+def check_role(user, allowed_roles):
+    """Raise ``PermissionDenied`` unless ``user`` has one of ``allowed_roles``"""
+    if not user or not user.is_authenticated:
+        raise PermissionDenied("Authentication required.")
 
-            if user_role not in allowed_values:
-                raise PermissionDenied(
-                    "You do not have permission to access this resource."
-                )
+    if not has_role(user, allowed_roles):
+        raise PermissionDenied("You do not have permission to access this resource.")
 
+
+def allow_permission(allowed_roles: list[UserRoleEnum]):
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(self, request, *args, **kwargs):
+            check_role(request.user, allowed_roles)
             return view_func(self, request, *args, **kwargs)
 
         return _wrapped_view
@@ -0,0 +1,73 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+# Fields whose to_representation() returns what values() already holds
+# (str, int, bool, JSON, a bare primary key), so the value is used as is.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+class Projection:
+    """Render ``values()`` rows exactly as ``serializer_class(many=True)``
+    renders model instances, without building the instances.
+
+    The readable fields are compiled once into ``(name, column, convert)``
+    steps. ``computed`` maps the fields that are not plain model columns,
+    such as ``SerializerMethodField``, to ``(columns, convert(row, context))``.
+    """
+
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+
+    @cached_property
+    def plan(self):
+        opts = self.serializer_class.Meta.model._meta
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                plan.append((name, None, self.computed[name][1]))
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or "." in field.source:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} needs an entry in "
+                    "Projection.computed."
+                )
+            column = opts.get_field(field.source).attname
+            convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            plan.append((name, column, convert))
+        return plan
+
+    @cached_property
+    def columns(self):
+        columns = [column for _, column, _ in self.plan if column is not None]
+        for computed_columns, _ in self.computed.values():
+            columns += computed_columns
+        return list(dict.fromkeys(columns))
+
+    def values(self, queryset, *extra):
+        """``queryset.values()`` of every column the plan reads, plus ``extra``"""
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def render(self, rows, context=None):
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self.plan:
+                if column is None:
+                    item[name] = convert(row, context)
+                    continue
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
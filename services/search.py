@@ -0,0 +1,36 @@
+from django.db import connections
+from rest_framework.filters import SearchFilter
+
+
+def build_search_document(*parts):
+    return " ".join(str(part).lower() for part in parts if part)
+
+
+class DocumentSearchFilter(SearchFilter):
+    """Search on the model's denormalized ``search_document`` column.
+
+    On Postgres the column carries a trigram GIN index, so each term becomes an
+    indexed ``LIKE`` and results are ranked by trigram word similarity. Other
+    backends fall back to the plain ``SearchFilter`` over ``search_fields``.
+    """
+
+    document_field = "search_document"
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        for term in search_terms:
+            queryset = queryset.filter(
+                **{f"{self.document_field}__contains": term.lower()}
+            )
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.annotate(
+            search_rank=TrigramWordSimilarity(
+                " ".join(search_terms).lower(), self.document_field
+            )
+        ).order_by("-search_rank", *ordering)
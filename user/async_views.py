@@ -0,0 +1,133 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from services.async_api import async_api_view, get_view
+from services.conditional import check_preconditions, set_validators
+from services.pagination import CustomPagination
+from services.utils import get_response
+
+from .enums import UserRoleEnum
+from .hashing import HasherBusy
+from .models import CustomUser
+from .profile_cache import aget_cached_profile, aset_cached_profile
+from .serializer import (
+    CustomUserLiteSerializer,
+    UserSerializer,
+    get_login_data,
+    user_lite_projection,
+)
+from .views import UserViewSet, aget_profile_validators
+
+
+@csrf_exempt
+@async_api_view(methods=["POST"], public=True)
+async def login(request):
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        payload = None
+    # Bodies that are not an object carry no credentials
+    if not isinstance(payload, dict):
+        payload = {}
+
+    serializer = UserSerializer(data=payload, context={"request": request})
+    serializer.is_valid(raise_exception=True)
+    try:
+        data = await serializer.avalidate_login()
+    except ValidationError as e:
+        return get_response(
+            message=e.detail,
+            errors=e.detail,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    except HasherBusy:
+        return get_response(
+            message="Too many login attempts in progress, please retry.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    return get_response(
+        is_success=True,
+        message="Login successful",
+        data=await sync_to_async(get_login_data)(data["user"], request),
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@async_api_view()
+async def user_profile(request):
+    user = request.user
+    cached, version = await aget_cached_profile(request)
+    if cached is None:
+        latest_form_id, etag, last_modified = await aget_profile_validators(user)
+        data = None
+    else:
+        data, etag, last_modified = cached
+    response = check_preconditions(request, etag, last_modified)
+    if response is None:
+        if data is None:
+            user.latest_form_id = latest_form_id
+            serializer = CustomUserLiteSerializer(user, context={"request": request})
+            data = dict(serializer.data)
+            await aset_cached_profile(request, version, data, etag, last_modified)
+        response = get_response(
+            is_success=True,
+            message="User profile fetched successfully.",
+            data=data,
+        )
+    return set_validators(response, etag, last_modified)
+
+
+@async_api_view(allowed_roles=[UserRoleEnum.SUPER_ADMIN])
+async def list_users(request):
+    queryset = get_view(UserViewSet, request, "list_user").get_list_queryset()
+    context = {"request": request}
+
+    paginator = CustomPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+
+    if page is not None:
+        return paginator.get_paginated_response(
+            user_lite_projection.render(page, context),
+            message="Users fetched successfully.",
+        )
+
+    return get_response(
+        is_success=True,
+        message="Users fetched successfully.",
+        data=user_lite_projection.render([row async for row in queryset], context),
+    )
+
+
+@async_api_view(allowed_roles=[UserRoleEnum.SUPER_ADMIN])
+async def retrieve_user(request, user_id):
+    try:
+        user = await CustomUser.objects.with_latest_form_id().aget(
+            id=user_id,
+            is_active=True,
+        )
+
+        serializer = CustomUserLiteSerializer(user, context={"request": request})
+        return get_response(
+            is_success=True,
+            message="User retrieved successfully.",
+            data=serializer.data,
+        )
+
+    except CustomUser.DoesNotExist:
+        return get_response(
+            is_success=False,
+            message="User not found.",
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    except Exception as e:
+        return get_response(
+            is_success=False,
+            message="Error retrieving user.",
+            errors=str(e),
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
@@ -1,8 +1,161 @@
-import hashlib
+from time import time
 
+from django.conf import settings
 from django.core.cache import cache
-from rest_framework.exceptions import AuthenticationFailed
-from rest_framework.permissions import IsAuthenticated
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser
+from .revocation import revocation_filter
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def get_cached_user(user_id):
+    cache_key = user_cache_key(user_id)
+    user = cache.get(cache_key)
+    if user is None:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(
+                cache_key, user, timeout=getattr(settings, "USER_CACHE_TIMEOUT", 300)
+            )
+    return user
+
+
+async def aget_cached_user(user_id):
+    cache_key = user_cache_key(user_id)
+    user = await cache.aget(cache_key)
+    if user is None:
+        user = await CustomUser.objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await cache.aset(
+                cache_key, user, timeout=getattr(settings, "USER_CACHE_TIMEOUT", 300)
+            )
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def issue_refresh_token(user):
+    refresh = RefreshToken.for_user(user)
+    refresh["user_role"] = user.user_role
+    # ``iat`` only has second precision, too coarse to order a token against a
+    # revocation made in the same second.
+    refresh["iat_ms"] = int(time() * 1000)
+    return refresh
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from the access token claims.
+
+    Attributes outside the claims are read from the cached ``CustomUser``, so
+    permission checks on ``user_role`` never load the user at all.
+    """
+
+    is_super_admin = False
+
+    @cached_property
+    def instance(self):
+        user = get_cached_user(self.id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return user
+
+    async def aload_instance(self):
+        """Load ``instance`` from async code, where the lazy load would raise"""
+        if "instance" not in self.__dict__:
+            user = await aget_cached_user(self.id)
+            if user is None:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+            self.__dict__["instance"] = user
+        return self.instance
+
+    @cached_property
+    def user_role(self):
+        return self.token.get("user_role") or self.instance.user_role
+
+    @property
+    def is_staff(self):
+        return self.instance.is_staff
+
+    @property
+    def is_superuser(self):
+        return self.instance.is_superuser
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that skips the per-request user query.
+
+    Read requests get a ``ClaimsUser``; writes get the full ``CustomUser`` from
+    the user cache, which ``user.signals`` clears whenever the row is saved.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS:
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                "Token contained no recognizable user identification"
+            ) from e
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                "The user's password has been changed.", code="password_changed"
+            )
+        return user
+
+
+def is_token_revoked(validated_token, refresh=True):
+    issued_at = validated_token.get("iat_ms", validated_token.get("iat", 0) * 1000)
+    return revocation_filter.is_revoked(
+        validated_token.get("jti"), refresh
+    ) or revocation_filter.is_user_revoked(
+        validated_token.get(api_settings.USER_ID_CLAIM), issued_at / 1000, refresh
+    )
 
 
 class CustomUserIsAuthenticated(IsAuthenticated):
@@ -10,12 +163,24 @@ class CustomUserIsAuthenticated(IsAuthenticated):
         is_authenticated = super().has_permission(request, view)
         if not is_authenticated:
             return False
-        is_allowed_user = True
-        token = request.auth.get("jti")
-        cache_key = hashlib.sha256(token.encode()).hexdigest()
-        cached_data = cache.get(cache_key)
-        if cached_data:
+        if is_token_revoked(request.auth):
             raise AuthenticationFailed("Token is expired")
-        else:
-            is_allowed_user = True
-        return is_allowed_user
+        return True
+
+
+async def aauthenticate_claims(request):
+    """``ClaimsJWTAuthentication`` and ``CustomUserIsAuthenticated`` for async
+    read views: returns ``(ClaimsUser, token)`` without touching the database
+    unless the revocation filter is due a refresh."""
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+
+    validated_token = authentication.get_validated_token(raw_token)
+    user = authentication.get_claims_user(validated_token)
+    await revocation_filter.arefresh()
+    if is_token_revoked(validated_token, refresh=False):
+        raise AuthenticationFailed("Token is expired")
+    return user, validated_token
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.signals import user_login_failed
+
+from .authentication import invalidate_cached_user
+from .models import CustomUser
+
+
+class HasherBusy(Exception):
+    """No hashing slot freed up within the queue timeout"""
+
+
+class BoundedHasher:
+    """Runs password hashing on a fixed-size thread pool.
+
+    PBKDF2 releases the GIL, so the pool hashes in parallel while the event
+    loop keeps serving other requests. Callers wait at most ``queue_timeout``
+    seconds for a free slot and get ``HasherBusy`` after that.
+    """
+
+    def __init__(self, max_workers, queue_timeout):
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = WeakKeyDictionary()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def get_slots(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._slots:
+            self._slots[loop] = asyncio.Semaphore(self.max_workers)
+        return self._slots[loop]
+
+    async def run(self, func, *args):
+        slots = self.get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HasherBusy()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            slots.release()
+
+
+password_hasher = BoundedHasher(
+    max_workers=getattr(settings, "LOGIN_HASH_CONCURRENCY", 4),
+    queue_timeout=getattr(settings, "LOGIN_HASH_QUEUE_TIMEOUT", 5.0),
+)
+
+
+async def alogin_failed(email, request):
+    # Sent with the same masked credentials as ``authenticate()`` sends
+    await user_login_failed.asend(
+        sender=__name__,
+        credentials={"username": email, "password": "********************"},
+        request=request,
+    )
+
+
+async def aauthenticate(email, password, request=None):
+    """Async counterpart of ``authenticate()`` for the email/password backend.
+
+    Stale hashes are re-encoded with the preferred hasher on success, like
+    ``check_password()`` does on the sync path, and ``user_login_failed`` is
+    sent on failure.
+    """
+    user = await CustomUser.objects.filter(email=email).afirst()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords.
+        await password_hasher.run(make_password, password)
+        await alogin_failed(email, request)
+        return None
+
+    is_correct, must_update = await password_hasher.run(
+        verify_password, password, user.password
+    )
+    if not is_correct or not user.is_active:
+        await alogin_failed(email, request)
+        return None
+
+    if must_update:
+        user.password = await password_hasher.run(make_password, password)
+        await CustomUser.objects.filter(pk=user.pk).aupdate(password=user.password)
+        invalidate_cached_user(user.pk)
+    return user
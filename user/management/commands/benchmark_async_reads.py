@@ -0,0 +1,126 @@
+import asyncio
+from threading import Semaphore, Thread
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from services.benchmark import format_summary, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent reads of /me, the user list and the form list and "
+        "detail through the sync views on a fixed pool of worker threads, as "
+        "a threaded WSGI server would, and through the async views on one "
+        "event loop. Uses an existing super admin account."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Clients sending requests at the same time.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Worker threads serving the sync views.",
+        )
+
+    def handle(self, *args, email, password, requests, concurrency, threads, **options):
+        if min(requests, concurrency, threads) < 1:
+            raise CommandError("--requests, --concurrency and --threads must be at least 1.")
+
+        client = Client()
+        response = client.post(
+            reverse("user:users-user-login"),
+            {"email": email, "password": password},
+            content_type="application/json",
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Login failed: {response.json()}")
+        headers = {"Authorization": f"Bearer {response.json()['data']['access']}"}
+
+        forms = client.get(reverse("form:root-form-list"), headers=headers)
+        if forms.status_code != 200:
+            raise CommandError(f"Listing forms failed: {forms.content[:500]!r}")
+        if not forms.json()["data"]:
+            raise CommandError("Create at least one form before benchmarking.")
+        form_id = forms.json()["data"][0]["id"]
+
+        endpoints = {
+            "/me": ("user:users-me", "user:async-me", []),
+            "list users": ("user:users-users", "user:async-users", []),
+            "list forms": ("form:root-form-list", "form:async-root-form-list", []),
+            "retrieve form": (
+                "form:root-form-detail",
+                "form:async-root-form-detail",
+                [form_id],
+            ),
+        }
+
+        for label, (sync_name, async_name, args) in endpoints.items():
+            sync_url, async_url = reverse(sync_name, args=args), reverse(async_name, args=args)
+            self.report(
+                f"{label} (sync, {threads} threads)",
+                *self.run_threads(sync_url, headers, requests, concurrency, threads),
+            )
+            self.report(
+                f"{label} (async)",
+                *asyncio.run(self.run_async(async_url, headers, requests, concurrency)),
+            )
+
+    def run_threads(self, url, headers, requests, concurrency, threads):
+        workers = Semaphore(threads)
+        results = []
+        # Clients share out the requests; each one holds at most one open
+        remaining = iter(range(requests))
+
+        def client_loop():
+            client = Client()
+            try:
+                for _ in remaining:
+                    start = perf_counter()
+                    with workers:
+                        status_code = client.get(url, headers=headers).status_code
+                    results.append((perf_counter() - start, status_code))
+            finally:
+                connections.close_all()
+
+        start = perf_counter()
+        clients = [Thread(target=client_loop) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return results, perf_counter() - start
+
+    async def run_async(self, url, headers, requests, concurrency):
+        client = AsyncClient()
+        results = []
+        remaining = iter(range(requests))
+
+        async def client_loop():
+            for _ in remaining:
+                start = perf_counter()
+                status_code = (await client.get(url, headers=headers)).status_code
+                results.append((perf_counter() - start, status_code))
+
+        start = perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return results, perf_counter() - start
+
+    def report(self, label, results, elapsed):
+        failures = sum(1 for _, status_code in results if status_code >= 400)
+        line = format_summary(label, summarize([duration for duration, _ in results]))
+        self.stdout.write(
+            f"{line} throughput={len(results) / elapsed:.0f}/s errors={failures}"
+        )
@@ -0,0 +1,83 @@
+import asyncio
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+
+from services.benchmark import format_summary, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a login storm through the ASGI handler and measure login p99 "
+        "and the latency of concurrent /me requests, for the sync and the "
+        "async login path. Uses an existing account."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--logins", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument(
+            "--background-requests",
+            type=int,
+            default=100,
+            help="/me requests sent while the login storm runs.",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(**options))
+
+    async def run(self, email, password, logins, concurrency, background_requests, **_):
+        client = AsyncClient()
+        credentials = {"email": email, "password": password}
+
+        response = await client.post(
+            reverse("user:async-login"), credentials, content_type="application/json"
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Login failed: {response.json()}")
+        headers = {"Authorization": f"Bearer {response.json()['data']['access']}"}
+
+        async def timed(request):
+            start = perf_counter()
+            response = await request()
+            return perf_counter() - start, response.status_code
+
+        def login_request(url):
+            return lambda: client.post(
+                url, credentials, content_type="application/json"
+            )
+
+        def me_request():
+            return client.get(reverse("user:users-me"), headers=headers)
+
+        async def run_batch(requests):
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(request):
+                async with semaphore:
+                    return await timed(request)
+
+            return await asyncio.gather(*(limited(request) for request in requests))
+
+        baseline = await run_batch([me_request] * background_requests)
+        self.report("/me (no logins)", baseline)
+
+        for label, url in (
+            ("sync", reverse("user:users-user-login")),
+            ("async", reverse("user:async-login")),
+        ):
+            login_results, me_results = await asyncio.gather(
+                run_batch([login_request(url)] * logins),
+                run_batch([me_request] * background_requests),
+            )
+            self.report(f"{label} login", login_results)
+            self.report(f"/me during {label} logins", me_results)
+
+    def report(self, label, results):
+        failures = sum(1 for _, status_code in results if status_code >= 400)
+        line = format_summary(label, summarize([elapsed for elapsed, _ in results]))
+        self.stdout.write(f"{line} errors={failures}")
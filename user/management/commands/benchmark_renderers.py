@@ -0,0 +1,92 @@
+from datetime import timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+from services.benchmark import format_summary, summarize
+from services.pagination import CustomPagination
+from services.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+
+
+def build_page(rows):
+    """A list response shaped like ``CustomPagination.get_paginated_response``"""
+    started = now()
+    results = [
+        {
+            "id": uuid4(),
+            "form_number": f"EMS-{i:06d}",
+            "status": "completed",
+            "current_step": 2,
+            "step_completed": [1, 2],
+            "created_at": started - timedelta(minutes=i, microseconds=i),
+            "updated_at": (started - timedelta(seconds=i)).isoformat(),
+            "user": {"id": str(uuid4()), "email": f"employee{i}@example.com"},
+            "personal_details": {
+                "first_name": f"First{i}",
+                "last_name": f"Last{i}",
+                "pan_number": "ABCDE1234F",
+                "date_of_birth": (started - timedelta(days=9000 + i)).date(),
+            },
+        }
+        for i in range(rows)
+    ]
+    return {
+        "is_success": True,
+        "message": "Forms fetched successfully.",
+        "pagination": {
+            "current_page": 1,
+            "page_size": rows,
+            "total_items": rows * 10,
+            "total_pages": 10,
+            "total_is_exact": True,
+            "has_next": True,
+            "has_previous": False,
+        },
+        "data": results,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSONRenderer against the orjson renderer (and MessagePack "
+        "when msgpack is installed) on a list page of form-like rows, and "
+        "check that both JSON renderers produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=CustomPagination.max_page_size
+        )
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, rows, iterations, **options):
+        page = build_page(rows)
+        renderers = {"JSONRenderer": JSONRenderer(), "ORJSONRenderer": ORJSONRenderer()}
+        if msgpack is not None:
+            renderers["MessagePackRenderer"] = MessagePackRenderer()
+
+        if renderers["ORJSONRenderer"].render(page) != renderers["JSONRenderer"].render(
+            page
+        ):
+            raise CommandError("ORJSONRenderer output differs from JSONRenderer.")
+
+        results = {}
+        for label, renderer in renderers.items():
+            renderer.render(page)
+            timings = []
+            for _ in range(iterations):
+                start = perf_counter()
+                body = renderer.render(page)
+                timings.append(perf_counter() - start)
+            results[label] = summary = summarize(timings)
+            self.stdout.write(f"{format_summary(label, summary)} bytes={len(body)}")
+
+        baseline = results["JSONRenderer"]["p50_ms"]
+        for label, summary in results.items():
+            if label != "JSONRenderer" and summary["p50_ms"]:
+                self.stdout.write(
+                    f"{label}: {baseline / summary['p50_ms']:.1f}x faster at p50"
+                )
@@ -0,0 +1,44 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.provisioning import (
+    get_file_format,
+    provision_users,
+    read_rows,
+    setup_worker,
+    summarize_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV or JSONL file (email, first_name, last_name, "
+        "phone_number, password) and print a JSONL result per row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Password hashing processes, defaults to the CPU count.",
+        )
+
+    def handle(self, path, format, chunk_size, workers, **options):
+        file_format = get_file_format(path, format)
+        if not file_format:
+            raise CommandError("Unsupported file format, pass --format csv|jsonl.")
+
+        # A one-off import can afford its own processes, unlike a request
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=setup_worker)
+        with executor, open(path, encoding="utf-8-sig", newline="") as stream:
+            rows = read_rows(stream, file_format)
+            for result in summarize_results(
+                provision_users(rows, chunk_size=chunk_size, executor=executor)
+            ):
+                self.stdout.write(json.dumps(result))
@@ -0,0 +1,82 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from user.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding JWTs (with their blacklist entries) and "
+        "expired revocations in small batches. Every batch commits on its own, "
+        "so the command can be stopped and re-run at any point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--sleep",
+            dest="pause",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches to spread out the load.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches per table.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for model in (OutstandingToken, RevokedToken):
+            expired = model.objects.filter(expires_at__lte=now)
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"{model._meta.verbose_name_plural}: {expired.count()} expired"
+                )
+                continue
+            deleted = self.purge(expired, **options)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural}: deleted {deleted}"
+                )
+            )
+
+    def purge(self, queryset, batch_size, pause, max_batches, **options):
+        # Walk the primary key forward so each batch is a short index range
+        # scan and only holds locks on the rows it deletes.
+        last_id = 0
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            ids = list(
+                queryset.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                # Blacklist rows go with their outstanding token via CASCADE.
+                deleted += queryset.model.objects.filter(id__in=ids).delete()[1].get(
+                    queryset.model._meta.label, 0
+                )
+
+            last_id = ids[-1]
+            batches += 1
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  batch {batches}: up to id {last_id}")
+            if pause:
+                sleep(pause)
+        return deleted
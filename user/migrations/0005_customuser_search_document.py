@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def build_search_documents(apps, schema_editor):
+    CustomUser = apps.get_model("user", "CustomUser")
+    users = []
+    for user in CustomUser.objects.only(
+        "email", "first_name", "last_name", "phone_number"
+    ).iterator(chunk_size=BATCH_SIZE):
+        user.search_document = " ".join(
+            part.lower()
+            for part in (user.email, user.first_name, user.last_name, user.phone_number)
+            if part
+        )
+        users.append(user)
+        # Written per chunk so only one chunk of users is held in memory
+        if len(users) == BATCH_SIZE:
+            CustomUser.objects.bulk_update(users, ["search_document"])
+            users.clear()
+    CustomUser.objects.bulk_update(users, ["search_document"])
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS users_search_document_trgm "
+        "ON users USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS users_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_alter_customuser_profile_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -6,8 +6,9 @@ from django.contrib.auth.models import (
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from services.models import BaseCoreModel
+from services.search import build_search_document
 from django.db import models
-from django.db.models import BooleanField, ImageField, Index
+from django.db.models import BooleanField, ImageField, Index, OuterRef, Subquery
 from .enums import UserRoleEnum
 
 
@@ -38,6 +39,16 @@ class CustomUserManager(BaseUserManager):
             raise ValueError("Superuser must have is_superuser=True.")
         return self.create_user(email, password, **extra_fields)
 
+    def with_latest_form_id(self):
+        from form.models import RootForm
+
+        latest_form = RootForm.objects.filter(created_by=OuterRef("pk")).order_by(
+            "-created_at"
+        )
+        return self.get_queryset().annotate(
+            latest_form_id=Subquery(latest_form.values("pk")[:1])
+        )
+
 
 class CustomUser(AbstractBaseUser, PermissionsMixin, BaseCoreModel):
     email = models.EmailField(unique=True)
@@ -60,10 +71,18 @@ class CustomUser(AbstractBaseUser, PermissionsMixin, BaseCoreModel):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = BooleanField(default=False)
+    search_document = models.TextField(blank=True, default="", editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = CustomUserManager()
     USERNAME_FIELD = "email"
 
+    # Fields copied into other tables or trusted from tokens; their loaded
+    # values are kept so saves can tell what changed without a query
+    TRACKED_FIELDS = ("email", "first_name", "last_name", "user_role")
+    # Fields the user's own search document is built from
+    SEARCHED_FIELDS = ("email", "first_name", "last_name", "phone_number")
+
     class Meta:
         db_table = "users"
         verbose_name = "User"
@@ -75,3 +94,54 @@ class CustomUser(AbstractBaseUser, PermissionsMixin, BaseCoreModel):
 
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: getattr(instance, name)
+            for name in cls.TRACKED_FIELDS
+            if name in field_names
+        }
+        return instance
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is not None and not set(update_fields).isdisjoint(
+            self.SEARCHED_FIELDS
+        ):
+            update_fields = {*update_fields, "search_document"}
+        super().save(*args, update_fields=update_fields, **kwargs)
+        saved = self.TRACKED_FIELDS if update_fields is None else update_fields
+        self._loaded_values = getattr(self, "_loaded_values", {})
+        self._loaded_values.update(
+            (name, getattr(self, name)) for name in self.TRACKED_FIELDS if name in saved
+        )
+
+    def has_changed(self, *fields):
+        """Whether any of ``fields`` differs from its stored value; fields that
+        were never loaded or saved through this instance count as changed"""
+        loaded = getattr(self, "_loaded_values", {})
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name) for name in fields
+        )
+
+    def build_search_document(self):
+        return build_search_document(
+            *(getattr(self, name) for name in self.SEARCHED_FIELDS)
+        )
+
+
+class RevokedToken(models.Model):
+    """Access token ``jti`` revoked before its expiry, shared by all workers"""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = "revoked_tokens"
+        verbose_name = "Revoked Token"
+        verbose_name_plural = "Revoked Tokens"
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from services.cache import is_process_local
+from services.metrics import registry
+
+
+def get_profile_cache():
+    """The cache holding /me payloads, or None while it is local to each
+    process, where invalidations would never reach the other workers"""
+    alias = getattr(settings, "PROFILE_CACHE_ALIAS", "default")
+    if is_process_local(alias):
+        return None
+    return caches[alias]
+
+
+def get_profile_timeout():
+    return getattr(settings, "PROFILE_CACHE_TIMEOUT", 300)
+
+
+def profile_version_key(user_id):
+    return f"profile-version:{user_id}"
+
+
+def profile_cache_key(request, version):
+    # The photo URL is absolute, so every scheme/host gets its own copy
+    return f"profile:{request.user.pk}:{version}:{request.build_absolute_uri('/')}"
+
+
+def record_lookup(cached):
+    registry.increment(
+        "ems_profile_cache_requests_total", result="miss" if cached is None else "hit"
+    )
+    return cached
+
+
+def get_profile_version(cache, user_id):
+    version = cache.get(profile_version_key(user_id))
+    if version is None:
+        version = 1
+        cache.add(profile_version_key(user_id), version, timeout=None)
+    return version
+
+
+async def aget_profile_version(cache, user_id):
+    version = await cache.aget(profile_version_key(user_id))
+    if version is None:
+        version = 1
+        await cache.aadd(profile_version_key(user_id), version, timeout=None)
+    return version
+
+
+def get_cached_profile(request):
+    """``(cached, version)`` for ``request.user``.
+
+    ``cached`` is ``(data, etag, last_modified)``, or None on a miss. A payload
+    rendered after a miss is stored under ``version``, so one built from rows
+    read before an invalidation lands under the old version and is never read.
+    """
+    cache = get_profile_cache()
+    if cache is None:
+        return None, None
+    version = get_profile_version(cache, request.user.pk)
+    return record_lookup(cache.get(profile_cache_key(request, version))), version
+
+
+async def aget_cached_profile(request):
+    cache = get_profile_cache()
+    if cache is None:
+        return None, None
+    version = await aget_profile_version(cache, request.user.pk)
+    return record_lookup(await cache.aget(profile_cache_key(request, version))), version
+
+
+def set_cached_profile(request, version, data, etag, last_modified):
+    cache = get_profile_cache()
+    if cache is None:
+        return
+    cache.set(
+        profile_cache_key(request, version),
+        (data, etag, last_modified),
+        timeout=get_profile_timeout(),
+    )
+
+
+async def aset_cached_profile(request, version, data, etag, last_modified):
+    cache = get_profile_cache()
+    if cache is None:
+        return
+    await cache.aset(
+        profile_cache_key(request, version),
+        (data, etag, last_modified),
+        timeout=get_profile_timeout(),
+    )
+
+
+def invalidate_cached_profile(user_id):
+    """Drop every cached rendering of the user's profile, on all hosts"""
+    cache = get_profile_cache()
+    if cache is None:
+        return
+    key = profile_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
@@ -0,0 +1,191 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from services.counts import bump_table_generation
+
+from .enums import UserRoleEnum
+from .models import CustomUser
+
+DEFAULT_PASSWORD = "Wedo@123"
+PROFILE_FIELDS = ("first_name", "last_name", "phone_number")
+
+# Shared by every upload in the worker. PBKDF2 releases the GIL, so threads
+# hash in parallel without forking a process pool per request.
+hash_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PROVISIONING_HASH_WORKERS", None),
+    thread_name_prefix="provision-hash",
+)
+
+
+def read_rows(stream, file_format):
+    """Yield ``(row, error)`` pairs from a CSV or JSONL text stream"""
+    if file_format == "csv":
+        for row in csv.DictReader(stream):
+            yield row, None
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield None, "Invalid JSON."
+            continue
+        if not isinstance(row, dict):
+            yield None, "Each line must be a JSON object."
+            continue
+        yield row, None
+
+
+def get_file_format(name, requested=None):
+    file_format = (requested or name.rsplit(".", 1)[-1]).lower()
+    if file_format in ("json", "ndjson"):
+        file_format = "jsonl"
+    return file_format if file_format in ("csv", "jsonl") else None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def setup_worker():
+    django.setup()
+
+
+def clean_text(value):
+    """Stripped text of a CSV or JSONL value; JSONL numbers are read as text"""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        raise ValidationError("Must be a string.")
+    return value.strip()
+
+
+def validate_row(row):
+    email, errors = None, {}
+    try:
+        email = CustomUser.objects.normalize_email(clean_text(row.get("email")))
+        validate_email(email)
+    except ValidationError as e:
+        errors["email"] = e.messages
+
+    fields = {}
+    for field_name in PROFILE_FIELDS:
+        try:
+            value = clean_text(row.get(field_name))
+        except ValidationError as e:
+            errors[field_name] = e.messages
+            continue
+        max_length = CustomUser._meta.get_field(field_name).max_length
+        if len(value) > max_length:
+            errors[field_name] = [f"Ensure this field has no more than {max_length} characters."]
+        fields[field_name] = value
+
+    if not isinstance(row.get("password") or "", str):
+        errors["password"] = ["Must be a string."]
+    return email, fields, errors
+
+
+def provision_chunk(chunk, seen_emails, executor):
+    results = {}
+    candidates = []
+    for line_number, (row, error) in chunk:
+        if error:
+            results[line_number] = {"status": "invalid", "errors": {"row": [error]}}
+            continue
+        email, fields, errors = validate_row(row)
+        if errors:
+            results[line_number] = {"email": email, "status": "invalid", "errors": errors}
+        elif email in seen_emails:
+            results[line_number] = {
+                "email": email,
+                "status": "duplicate",
+                "errors": {"email": ["Duplicate email in file."]},
+            }
+        else:
+            seen_emails.add(email)
+            candidates.append((line_number, email, fields, row.get("password")))
+
+    existing = set(
+        CustomUser.objects.filter(
+            email__in=[email for _, email, _, _ in candidates]
+        ).values_list("email", flat=True)
+    )
+    new_users = [candidate for candidate in candidates if candidate[1] not in existing]
+    passwords = [password or DEFAULT_PASSWORD for *_, password in new_users]
+    hashed = executor.map(make_password, passwords, chunksize=16)
+
+    users = {}
+    for (line_number, email, fields, _), encoded in zip(new_users, hashed):
+        user = CustomUser(
+            email=email,
+            password=encoded,
+            user_role=UserRoleEnum.USER.value,
+            is_active=True,
+            **fields,
+        )
+        # bulk_create skips the pre_save signal that normally fills this in.
+        user.search_document = user.build_search_document()
+        users[line_number] = user
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users.values(), ignore_conflicts=True)
+        created = set(
+            CustomUser.objects.filter(
+                pk__in=[user.pk for user in users.values()]
+            ).values_list("pk", flat=True)
+        )
+    if created:
+        bump_table_generation(CustomUser._meta.db_table)
+
+    for line_number, email, _, _ in candidates:
+        user = users.get(line_number)
+        if user is not None and user.pk in created:
+            results[line_number] = {"email": email, "status": "created", "id": str(user.pk)}
+        else:
+            results[line_number] = {
+                "email": email,
+                "status": "duplicate",
+                "errors": {"email": ["This email already exists."]},
+            }
+
+    for line_number, _ in chunk:
+        yield {"row": line_number, **results[line_number]}
+
+
+def provision_users(rows, chunk_size=500, executor=None):
+    """Create users from ``(row, error)`` pairs, yielding one result per row.
+
+    Rows are processed ``chunk_size`` at a time: one duplicate lookup and one
+    ``bulk_create`` per chunk, with passwords hashed on ``executor``, the
+    shared ``hash_executor`` by default. Only the emails seen so far are kept
+    in memory.
+    """
+    executor = executor or hash_executor
+    seen_emails = set()
+    for chunk in chunked(enumerate(rows, start=1), chunk_size):
+        yield from provision_chunk(chunk, seen_emails, executor)
+
+
+def summarize_results(results):
+    """Pass results through while counting them per status"""
+    summary = {"created": 0, "duplicate": 0, "invalid": 0}
+    for result in results:
+        summary[result["status"]] += 1
+        yield result
+    yield {"summary": summary}
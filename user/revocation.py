@@ -0,0 +1,99 @@
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RevokedToken
+
+USER_KEY_PREFIX = "user:"
+
+
+class RevocationFilter:
+    """In-process copy of the non-expired ``RevokedToken`` rows.
+
+    Lookups are a dict membership test. Every ``refresh_interval`` seconds the
+    filter pulls rows revoked since its last refresh (minus ``overlap`` to
+    cover transactions that committed late) and drops expired entries, so a
+    revocation made on any worker is seen everywhere within one interval.
+    """
+
+    def __init__(self, refresh_interval=5, overlap=60):
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._revoked = {}
+        self._watermark = None
+        self._next_refresh = 0.0
+        self._lock = Lock()
+
+    def _get(self, key, refresh=True):
+        if refresh and monotonic() >= self._next_refresh:
+            self.refresh()
+        return self._revoked.get(key)
+
+    def is_revoked(self, jti, refresh=True):
+        return self._get(jti, refresh) is not None
+
+    def is_user_revoked(self, user_id, issued_at, refresh=True):
+        """Whether every token of ``user_id`` issued up to now was revoked"""
+        entry = self._get(f"{USER_KEY_PREFIX}{user_id}", refresh)
+        return entry is not None and issued_at < entry[1].timestamp()
+
+    def add(self, jti, expires_at, revoked_at):
+        self._revoked[jti] = (expires_at, revoked_at)
+
+    def refresh(self):
+        with self._lock:
+            if monotonic() < self._next_refresh:
+                return
+
+            now = timezone.now()
+            queryset = RevokedToken.objects.filter(expires_at__gt=now)
+            if self._watermark is not None:
+                queryset = queryset.filter(revoked_at__gte=self._watermark - self.overlap)
+
+            revoked = {
+                jti: entry for jti, entry in self._revoked.items() if entry[0] > now
+            }
+            for jti, expires_at, revoked_at in queryset.values_list(
+                "jti", "expires_at", "revoked_at"
+            ):
+                revoked[jti] = (expires_at, revoked_at)
+
+            self._revoked = revoked
+            self._watermark = now
+            self._next_refresh = monotonic() + self.refresh_interval
+
+    async def arefresh(self):
+        """Refresh from async code when due; the lookups that follow should
+        pass ``refresh=False``, as a refresh there would query synchronously."""
+        if monotonic() >= self._next_refresh:
+            await sync_to_async(self.refresh)()
+
+    def reset(self):
+        with self._lock:
+            self._revoked = {}
+            self._watermark = None
+            self._next_refresh = 0.0
+
+
+revocation_filter = RevocationFilter(
+    refresh_interval=getattr(settings, "TOKEN_REVOCATION_REFRESH_INTERVAL", 5),
+)
+
+
+def revoke_token(jti, expires_at=None):
+    revoked_at = timezone.now()
+    if expires_at is None:
+        expires_at = revoked_at + settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]
+    RevokedToken.objects.update_or_create(
+        jti=jti, defaults={"expires_at": expires_at, "revoked_at": revoked_at}
+    )
+    revocation_filter.add(jti, expires_at, revoked_at)
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every access token issued to ``user_id`` until now"""
+    revoke_token(f"{USER_KEY_PREFIX}{user_id}")
@@ -1,7 +1,5 @@
-import hashlib
-
 from django.contrib.auth import authenticate
-from django.core.cache import cache
+from django.contrib.auth.signals import user_logged_in
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import (
     AccessToken,
@@ -9,7 +7,12 @@ from rest_framework_simplejwt.tokens import (
     TokenError,
 )
 
+from services.projection import Projection
+
+from .authentication import issue_refresh_token
+from .hashing import aauthenticate
 from .models import CustomUser
+from .revocation import revoke_token
 
 
 class UserSerializer(serializers.Serializer):
@@ -21,16 +24,18 @@ class UserSerializer(serializers.Serializer):
 
     default_error_messages = {"bad_token": ("Token is invalid or expired")}
 
-    def validate_login(self):
+    def get_credentials(self):
         email = self.initial_data.get("email")
         password = self.initial_data.get("password")
 
-        if not email or not password:
+        if not all(value and isinstance(value, str) for value in (email, password)):
             raise serializers.ValidationError(
                 "Email and password are required for login."
             )
 
-        user = authenticate(username=email, password=password)
+        return email, password
+
+    def check_login_user(self, user):
         if not user:
             raise serializers.ValidationError(
                 {"error": "Invalid username or password."}
@@ -38,6 +43,20 @@ class UserSerializer(serializers.Serializer):
 
         return {"user": user}
 
+    def validate_login(self):
+        email, password = self.get_credentials()
+        request = self.context.get("request")
+        return self.check_login_user(
+            authenticate(request, username=email, password=password)
+        )
+
+    async def avalidate_login(self):
+        """``validate_login`` hashing on the bounded pool; raises
+        ``HasherBusy`` when no slot frees up"""
+        email, password = self.get_credentials()
+        request = self.context.get("request")
+        return self.check_login_user(await aauthenticate(email, password, request))
+
     def validate(self, attrs):
         self.refresh_token = attrs.get("refresh")
         self.access_token = attrs.get("access")
@@ -48,8 +67,7 @@ class UserSerializer(serializers.Serializer):
         try:
             token = RefreshToken(self.refresh_token)
             token.blacklist()
-            cache_key = hashlib.sha256(self.token.encode()).hexdigest()
-            cache.set(cache_key, "blacklisted", timeout=86400)
+            revoke_token(self.token)
         except TokenError:
             self.fail("bad_token")
 
@@ -111,10 +129,46 @@ class CustomUserLiteSerializer(serializers.ModelSerializer):
         return None
 
     def get_form_id(self, instance):
+        # Annotated by CustomUser.objects.with_latest_form_id() on list pages
+        if hasattr(instance, "latest_form_id"):
+            return instance.latest_form_id or ""
         # Handle AnonymousUser or users without rootform_created_by attribute
         if not hasattr(instance, "rootform_created_by"):
             return ""
-        form = instance.rootform_created_by.all().order_by("-created_at").first()
+        form = (
+            instance.rootform_created_by.filter(deleted_at__isnull=True)
+            .order_by("-created_at")
+            .first()
+        )
         if form:
             return form.pk
         return ""
+
+
+def project_profile_photo(row, context):
+    if not row["profile_photo"]:
+        return None
+    storage = CustomUser._meta.get_field("profile_photo").storage
+    return context["request"].build_absolute_uri(storage.url(row["profile_photo"]))
+
+
+# Rows from CustomUser.objects.with_latest_form_id()
+user_lite_projection = Projection(
+    CustomUserLiteSerializer,
+    computed={
+        "form_id": (["latest_form_id"], lambda row, context: row["latest_form_id"] or ""),
+        "profile_photo": (["profile_photo"], project_profile_photo),
+    },
+)
+
+
+def get_login_data(user, request):
+    # Token logins skip ``django.contrib.auth.login()``; the signal still
+    # updates ``last_login``
+    user_logged_in.send(sender=user.__class__, request=request, user=user)
+    refresh = issue_refresh_token(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+        "user": CustomUserLiteSerializer(user, context={"request": request}).data,
+    }
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from services.counts import bump_table_generation
+
+from .authentication import invalidate_cached_user
+from .models import CustomUser
+from .profile_cache import invalidate_cached_profile
+from .revocation import revoke_user_tokens
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_counts(sender, instance, **kwargs):
+    bump_table_generation(sender._meta.db_table)
+
+
+@receiver(pre_save, sender=CustomUser)
+def set_user_search_document(sender, instance, update_fields=None, **kwargs):
+    # ``CustomUser.save`` adds ``search_document`` to partial saves of any of
+    # its searched fields
+    if update_fields is None or "search_document" in update_fields:
+        instance.search_document = instance.build_search_document()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+    invalidate_cached_profile(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_tokens_on_credential_change(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created:
+        return
+    # Access tokens carry ``user_role`` and read views trust it, so a role
+    # change must end them as well.
+    role_changed = (
+        update_fields is None or "user_role" in update_fields
+    ) and instance.has_changed("user_role")
+    # ``_password`` is only set by an explicit set_password(), not by the
+    # transparent hash upgrade in check_password().
+    if instance._password is not None or not instance.is_active or role_changed:
+        revoke_user_tokens(instance.pk)
@@ -1,3 +1,653 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest.mock import patch
+from uuid import uuid4
 
-# Create your tests here.
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from form.models import RootForm
+from services.metrics import registry
+from services.nplusone import NPlusOneError, detect_nplusone
+from services.renderers import ORJSONRenderer
+
+from .authentication import ClaimsUser, issue_refresh_token
+from .enums import UserRoleEnum
+from .hashing import HasherBusy
+from .models import CustomUser, RevokedToken
+from .profile_cache import (
+    get_cached_profile,
+    get_profile_cache,
+    invalidate_cached_profile,
+    set_cached_profile,
+)
+from .provisioning import provision_users
+from .revocation import (
+    RevocationFilter,
+    revocation_filter,
+    revoke_token,
+    revoke_user_tokens,
+)
+from .serializer import CustomUserLiteSerializer, user_lite_projection
+
+
+class UserListNPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        for i in range(10):
+            user = CustomUser.objects.create_user(
+                email=f"employee{i}@example.com", password="password"
+            )
+            RootForm.objects.create(user=user, created_by=user)
+
+    def test_list_users_does_not_query_per_user(self):
+        # The test runner makes the detector raise inside the request
+        token = issue_refresh_token(self.admin).access_token
+        response = self.client.get(
+            reverse("user:users-users"),
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(row["form_id"] for row in response.json()["data"]))
+
+    def test_per_user_form_lookup_is_reported(self):
+        with self.assertRaisesMessage(NPlusOneError, "in get_form_id"):
+            with detect_nplusone("lite serializer", threshold=5, raise_error=True):
+                CustomUserLiteSerializer(
+                    CustomUser.objects.all(),
+                    many=True,
+                    context={"request": RequestFactory().get("/")},
+                ).data
+
+
+BACKENDS = "django.core.cache.backends"
+
+
+class SharedProfileCacheMixin:
+    """Cache /me payloads in a cache shared between processes, as deployed"""
+
+    @classmethod
+    def setUpClass(cls):
+        location = mkdtemp(prefix="ems-profiles-")
+        cls.addClassCleanup(rmtree, location, ignore_errors=True)
+        cls.enterClassContext(
+            override_settings(
+                CACHES={
+                    "default": {"BACKEND": f"{BACKENDS}.locmem.LocMemCache"},
+                    "profiles": {
+                        "BACKEND": f"{BACKENDS}.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    },
+                },
+                PROFILE_CACHE_ALIAS="profiles",
+            )
+        )
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        caches["profiles"].clear()
+
+
+class ProfileCacheTests(SharedProfileCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password", first_name="Old"
+        )
+
+    def setUp(self):
+        super().setUp()
+        token = issue_refresh_token(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.url = reverse("user:users-me")
+
+    def get_lookups(self, result):
+        _, counters = registry.collect()
+        key = ("ems_profile_cache_requests_total", (("result", result),))
+        return counters.get(key, 0)
+
+    def test_repeated_profile_is_served_from_cache(self):
+        first = self.client.get(self.url, headers=self.headers)
+        hits = self.get_lookups("hit")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, headers=self.headers)
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.get_lookups("hit"), hits + 1)
+
+    def test_new_form_invalidates_profile(self):
+        self.client.get(self.url, headers=self.headers)
+        root_form = RootForm.objects.create(user=self.user, created_by=self.user)
+
+        response = self.client.get(self.url, headers=self.headers)
+
+        self.assertEqual(response.json()["data"]["form_id"], str(root_form.pk))
+
+    def test_update_profile_invalidates_profile(self):
+        self.client.get(self.url, headers=self.headers)
+        self.client.patch(
+            reverse("user:users-update-profile"),
+            {"first_name": "New"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        response = self.client.get(self.url, headers=self.headers)
+
+        self.assertEqual(response.json()["data"]["first_name"], "New")
+
+    def test_payload_rendered_before_invalidation_is_not_served(self):
+        request = RequestFactory().get(self.url)
+        request.user = self.user
+        cached, version = get_cached_profile(request)
+        self.assertIsNone(cached)
+
+        # The user changes while the stale payload is being rendered
+        invalidate_cached_profile(self.user.pk)
+        set_cached_profile(request, version, {"first_name": "Old"}, '"etag"', None)
+
+        self.assertIsNone(get_cached_profile(request)[0])
+
+    @override_settings(PROFILE_CACHE_ALIAS="default")
+    def test_process_local_cache_is_not_used(self):
+        self.assertIsNone(get_profile_cache())
+        self.client.get(self.url, headers=self.headers)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url, headers=self.headers)
+
+
+class ORJSONRendererTests(TestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            "id": uuid4(),
+            "created_at": datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=timezone.utc),
+            "date": date(2024, 5, 1),
+            "amount": Decimal("10.50"),
+            "message": gettext_lazy("Profile updated successfully."),
+            "errors": {0: ["Line\u2028break"]},
+            "rows": [{"name": "Zoë", "score": 1.5, "active": True, "photo": None}],
+        }
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_profile_is_rendered_with_orjson(self):
+        user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+        token = issue_refresh_token(user).access_token
+
+        response = self.client.get(
+            reverse("user:users-me"), headers={"Authorization": f"Bearer {token}"}
+        )
+
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(response.json()["data"]["email"], user.email)
+
+
+class UserLiteProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password", first_name="Zoë"
+        )
+        CustomUser.objects.create_user(
+            email="photo@example.com",
+            password="password",
+            profile_photo="user_profile/photo.png",
+        )
+        RootForm.objects.create(user=cls.user, created_by=cls.user)
+
+    def test_projection_matches_serializer(self):
+        queryset = CustomUser.objects.with_latest_form_id().order_by("email")
+        context = {"request": RequestFactory().get("/")}
+
+        self.assertEqual(
+            JSONRenderer().render(
+                user_lite_projection.render(
+                    user_lite_projection.values(queryset), context
+                )
+            ),
+            JSONRenderer().render(
+                CustomUserLiteSerializer(queryset, many=True, context=context).data
+            ),
+        )
+
+
+class AsyncUserViewTests(SharedProfileCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+        cls.employee = CustomUser.objects.create_user(
+            email="employee@example.com", password="password", first_name="Zoë"
+        )
+        RootForm.objects.create(user=cls.employee, created_by=cls.employee)
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {
+            "Authorization": f"Bearer {issue_refresh_token(self.admin).access_token}"
+        }
+        self.employee_headers = {
+            "Authorization": f"Bearer {issue_refresh_token(self.employee).access_token}"
+        }
+
+    async def assert_same_response(self, sync_url, async_url, headers=None):
+        headers = headers or self.headers
+        expected = await self.async_client.get(sync_url, headers=headers)
+        response = await self.async_client.get(async_url, headers=headers)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    async def test_profile_matches_sync_view(self):
+        # Renders on a cache miss, then serves the cached payload
+        for _ in range(2):
+            await self.assert_same_response(
+                reverse("user:users-me"),
+                reverse("user:async-me"),
+                self.employee_headers,
+            )
+
+    async def test_list_matches_sync_view(self):
+        await self.assert_same_response(
+            reverse("user:users-users"), reverse("user:async-users")
+        )
+
+    async def test_retrieve_matches_sync_view(self):
+        for user_id in (self.employee.pk, uuid4(), "invalid"):
+            await self.assert_same_response(
+                reverse("user:users-retrieve-user", args=[user_id]),
+                reverse("user:async-retrieve-user", args=[user_id]),
+            )
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+
+    def setUp(self):
+        revocation_filter.reset()
+        self.addCleanup(revocation_filter.reset)
+        self.refresh = issue_refresh_token(self.user)
+        self.access = self.refresh.access_token
+        self.headers = {"Authorization": f"Bearer {self.access}"}
+
+    def test_revoked_token_is_stored_for_every_worker(self):
+        expires_at = now() + timedelta(minutes=5)
+        revoke_token("revoked-jti", expires_at)
+
+        self.assertEqual(
+            RevokedToken.objects.get(jti="revoked-jti").expires_at, expires_at
+        )
+        self.assertTrue(revocation_filter.is_revoked("revoked-jti"))
+
+    def test_filter_refreshes_from_table(self):
+        revocations = RevocationFilter(refresh_interval=3600)
+        self.assertFalse(revocations.is_revoked("other-worker-jti"))
+
+        # Revoked by another worker after this filter's last refresh
+        RevokedToken.objects.create(
+            jti="other-worker-jti", expires_at=now() + timedelta(minutes=5)
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(revocations.is_revoked("other-worker-jti"))
+
+        revocations.reset()
+        self.assertTrue(revocations.is_revoked("other-worker-jti"))
+
+    def test_refresh_drops_expired_entries(self):
+        revocations = RevocationFilter(refresh_interval=0)
+        revocations.add("expired-jti", now() - timedelta(seconds=1), now())
+
+        self.assertFalse(revocations.is_revoked("expired-jti"))
+
+    def test_revoked_access_token_is_rejected(self):
+        revoke_token(self.access["jti"])
+
+        response = self.client.get(reverse("user:users-me"), headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoked_user_tokens_are_rejected(self):
+        revoke_user_tokens(self.user.pk)
+
+        response = self.client.get(reverse("user:users-me"), headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_revokes_tokens(self):
+        response = self.client.post(
+            reverse("user:users-user-logout"),
+            {"refresh": str(self.refresh)},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        for name in ("user:users-user-refresh", "user:users-user-logout"):
+            response = self.client.post(
+                reverse(name),
+                {"refresh": str(self.refresh)},
+                content_type="application/json",
+                headers=self.headers,
+            )
+            self.assertEqual(response.status_code, 401)
+
+        # The blacklisted refresh token is refused with a fresh access token too
+        fresh = issue_refresh_token(self.user).access_token
+        response = self.client.post(
+            reverse("user:users-user-refresh"),
+            {"refresh": str(self.refresh)},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {fresh}"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ClaimsRoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+
+    def setUp(self):
+        revocation_filter.reset()
+        self.addCleanup(revocation_filter.reset)
+        self.access = issue_refresh_token(self.admin).access_token
+        self.headers = {"Authorization": f"Bearer {self.access}"}
+
+    def test_role_is_read_from_token(self):
+        with self.assertNumQueries(0):
+            user_role = ClaimsUser(self.access).user_role
+        self.assertEqual(user_role, UserRoleEnum.SUPER_ADMIN.value)
+
+    def test_token_without_role_falls_back_to_user(self):
+        del self.access["user_role"]
+        self.assertEqual(
+            ClaimsUser(self.access).user_role, UserRoleEnum.SUPER_ADMIN.value
+        )
+
+    def test_role_change_revokes_tokens(self):
+        list_url = reverse("form:root-form-list")
+        response = self.client.get(list_url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        admin = CustomUser.objects.get(pk=self.admin.pk)
+        admin.user_role = UserRoleEnum.USER.value
+        admin.save()
+
+        response = self.client.get(list_url, headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_changes_keep_tokens(self):
+        admin = CustomUser.objects.get(pk=self.admin.pk)
+        admin.first_name = "Renamed"
+        admin.save()
+        admin.last_login = now()
+        admin.save(update_fields=["last_login"])
+
+        response = self.client.get(reverse("user:users-me"), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncLoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+
+    def setUp(self):
+        self.url = reverse("user:async-login")
+
+    async def login(self, body):
+        return await self.async_client.post(
+            self.url, body, content_type="application/json"
+        )
+
+    async def test_login_returns_tokens(self):
+        response = await self.login(
+            {"email": "employee@example.com", "password": "password"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["access"])
+
+    async def test_login_matches_sync_login(self):
+        body = {"email": "employee@example.com", "password": "password"}
+        response = await self.login(body)
+        sync_response = await self.async_client.post(
+            reverse("user:users-user-login"), body, content_type="application/json"
+        )
+
+        self.assertEqual(response["Content-Type"], sync_response["Content-Type"])
+        self.assertEqual(response.json().keys(), sync_response.json().keys())
+
+    async def test_login_updates_last_login(self):
+        await self.login({"email": "employee@example.com", "password": "password"})
+
+        user = await CustomUser.objects.aget(pk=self.user.pk)
+        self.assertIsNotNone(user.last_login)
+
+    async def test_failed_login_sends_signal(self):
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials["username"])
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        await self.login({"email": "employee@example.com", "password": "wrong"})
+
+        self.assertEqual(failures, ["employee@example.com"])
+
+    async def test_bad_credentials_are_rejected(self):
+        for email, password in (
+            ("employee@example.com", "wrong"),
+            ("unknown@example.com", "password"),
+        ):
+            response = await self.login({"email": email, "password": password})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()["status"])
+
+    async def test_malformed_body_is_rejected(self):
+        for body in ("[]", "not json", '"text"', '{"email": 1, "password": 2}'):
+            response = await self.login(body)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json()["errors"],
+                ["Email and password are required for login."],
+            )
+
+    async def test_busy_hasher_asks_to_retry(self):
+        with patch("user.serializer.aauthenticate", side_effect=HasherBusy):
+            response = await self.login(
+                {"email": "employee@example.com", "password": "password"}
+            )
+
+        self.assertEqual(response.status_code, 503)
+
+
+class ProvisioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            email="admin@example.com",
+            password="password",
+            user_role=UserRoleEnum.SUPER_ADMIN.value,
+        )
+
+    def provision(self, *rows):
+        return list(provision_users([(row, None) for row in rows]))
+
+    def test_valid_rows_are_created(self):
+        results = self.provision(
+            {"email": " New@Example.com ", "first_name": "New", "password": "secret"},
+            {"email": "phone@example.com", "phone_number": 9876543210},
+        )
+
+        self.assertEqual([result["status"] for result in results], ["created"] * 2)
+        user = CustomUser.objects.get(email="New@example.com")
+        self.assertTrue(user.check_password("secret"))
+        self.assertEqual(
+            CustomUser.objects.get(email="phone@example.com").phone_number,
+            "9876543210",
+        )
+
+    def test_invalid_rows_are_reported(self):
+        results = self.provision(
+            {"email": "not-an-email"},
+            {"email": ["a@example.com"]},
+            {"email": "names@example.com", "first_name": {"a": 1}, "password": 1},
+            {"email": "long@example.com", "last_name": "x" * 51},
+        )
+
+        self.assertEqual([result["status"] for result in results], ["invalid"] * 4)
+        self.assertEqual(
+            [sorted(result["errors"]) for result in results],
+            [["email"], ["email"], ["first_name", "password"], ["last_name"]],
+        )
+        self.assertFalse(CustomUser.objects.exclude(pk=self.admin.pk).exists())
+
+    def test_duplicate_rows_are_reported(self):
+        results = self.provision(
+            {"email": "admin@example.com"},
+            {"email": "twice@example.com"},
+            {"email": "twice@example.com"},
+        )
+
+        self.assertEqual(
+            [(result["status"], result.get("errors")) for result in results],
+            [
+                ("duplicate", {"email": ["This email already exists."]}),
+                ("created", None),
+                ("duplicate", {"email": ["Duplicate email in file."]}),
+            ],
+        )
+
+    def test_upload_streams_a_result_per_row(self):
+        upload = SimpleUploadedFile(
+            "users.jsonl",
+            b'{"email": "one@example.com", "phone_number": 12345}\n'
+            b"[]\n"
+            b'{"email": "one@example.com"}\n',
+        )
+        token = issue_refresh_token(self.admin).access_token
+
+        response = self.client.post(
+            reverse("user:users-bulk-add"),
+            {"file": upload},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.streaming_content]
+        self.assertEqual(
+            [line.get("status") for line in lines[:-1]],
+            ["created", "invalid", "duplicate"],
+        )
+        self.assertEqual(
+            lines[-1], {"summary": {"created": 1, "duplicate": 1, "invalid": 1}}
+        )
+
+
+class MetricsViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse("metrics")
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_are_closed_without_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    def test_metrics_require_token(self):
+        for headers in ({}, {"Authorization": "Bearer wrong"}):
+            response = self.client.get(self.url, headers=headers)
+            self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            self.url, headers={"Authorization": "Bearer scrape-token"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            b"# TYPE ems_request_duration_seconds histogram", response.content
+        )
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="employee@example.com", password="password"
+        )
+
+    def get_profile(self):
+        token = issue_refresh_token(self.user).access_token
+        return self.client.get(
+            reverse("user:users-me"), headers={"Authorization": f"Bearer {token}"}
+        )
+
+    def get_observations(self, name):
+        histograms, _ = registry.collect()
+        return sum(
+            sum(counts)
+            for (metric, labels), (counts, _) in histograms.items()
+            if metric == name and ("route", "users-me") in labels
+        )
+
+    @override_settings(SERVER_TIMING_ENABLED=False, SERIALIZER_TIMING_ENABLED=False)
+    def test_timing_is_recorded_without_header(self):
+        requests = self.get_observations("ems_request_duration_seconds")
+        serialized = self.get_observations("ems_request_serializer_seconds")
+
+        response = self.get_profile()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(
+            self.get_observations("ems_request_duration_seconds"), requests + 1
+        )
+        self.assertEqual(
+            self.get_observations("ems_request_serializer_seconds"), serialized
+        )
+
+    @override_settings(SERVER_TIMING_ENABLED=True, SERIALIZER_TIMING_ENABLED=True)
+    def test_header_when_enabled(self):
+        response = self.get_profile()
+
+        metrics = response["Server-Timing"].split(", ")
+        self.assertEqual(
+            [metric.split(";")[0] for metric in metrics], ["db", "serializer", "total"]
+        )
@@ -1,5 +1,7 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import UserViewSet
 
 
@@ -8,5 +10,14 @@ router = DefaultRouter()
 
 router.register(r"", UserViewSet, basename="users")
 
-urlpatterns = []
+urlpatterns = [
+    path("async/login/", async_views.login, name="async-login"),
+    path("async/me/", async_views.user_profile, name="async-me"),
+    path("async/users/", async_views.list_users, name="async-users"),
+    path(
+        "async/retrieve-user/<str:user_id>/",
+        async_views.retrieve_user,
+        name="async-retrieve-user",
+    ),
+]
 urlpatterns += router.urls
@@ -1,31 +1,78 @@
+import json
+from io import TextIOWrapper
+
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.filters import SearchFilter
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 
+from form.models import RootForm
+from services.conditional import (
+    check_preconditions,
+    get_last_modified,
+    make_etag,
+    set_validators,
+)
 from services.pagination import CustomPagination
+from services.search import DocumentSearchFilter
 from services.utils import get_response
 from services.permissions import allow_permission
 
-from .authentication import CustomUserIsAuthenticated
+from .authentication import CustomUserIsAuthenticated, issue_refresh_token
 from .enums import UserRoleEnum
 from .models import CustomUser
+from .profile_cache import get_cached_profile, set_cached_profile
+from .provisioning import (
+    DEFAULT_PASSWORD,
+    get_file_format,
+    provision_users,
+    read_rows,
+    summarize_results,
+)
 from .serializer import (
     UserSerializer,
     CustomUserSerializer,
     CustomUserLiteSerializer,
+    get_login_data,
+    user_lite_projection,
 )
 
 
+def get_latest_form_ids(user):
+    return (
+        RootForm.objects.filter(created_by_id=user.pk)
+        .order_by("-created_at")
+        .values_list("pk", flat=True)
+    )
+
+
+def build_profile_validators(user, latest_form_id):
+    # ``pk`` is a string on token users and a UUID on model instances
+    etag = make_etag(str(user.pk), user.updated_at, latest_form_id)
+    return latest_form_id, etag, get_last_modified(user.updated_at)
+
+
+def get_profile_validators(user):
+    """Latest form id plus the ETag and Last-Modified of ``/me``"""
+    return build_profile_validators(user, get_latest_form_ids(user).first())
+
+
+async def aget_profile_validators(user):
+    """``get_profile_validators`` for a ``ClaimsUser`` in async views"""
+    await user.aload_instance()
+    return build_profile_validators(user, await get_latest_form_ids(user).afirst())
+
+
 class UserViewSet(viewsets.GenericViewSet):
     permission_classes = [CustomUserIsAuthenticated]
     serializer_class = UserSerializer
 
-    filter_backends = [SearchFilter]
+    filter_backends = [DocumentSearchFilter]
     search_fields = [
         "first_name",
         "last_name",
@@ -51,21 +98,10 @@ class UserViewSet(viewsets.GenericViewSet):
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
 
-        user = data["user"]
-        refresh = RefreshToken.for_user(user)
-        refresh["user_role"] = user.user_role
-
-        access = str(refresh.access_token)
-        user_data = CustomUserLiteSerializer(user, context={"request": request}).data
-
         return get_response(
             is_success=True,
             message="Login successful",
-            data={
-                "refresh": str(refresh),
-                "access": access,
-                "user": user_data,
-            },
+            data=get_login_data(data["user"], request),
             status_code=status.HTTP_200_OK,
         )
 
@@ -91,10 +127,15 @@ class UserViewSet(viewsets.GenericViewSet):
         refresh_token = request.data.get("refresh")
         if refresh_token:
             try:
-                user = OutstandingToken.objects.get(token=refresh_token).user
-                RefreshToken(refresh_token).blacklist()
+                token = RefreshToken(refresh_token)
+                user = (
+                    OutstandingToken.objects.select_related("user")
+                    .get(jti=token[api_settings.JTI_CLAIM])
+                    .user
+                )
+                token.blacklist()
 
-                new_refresh_token = RefreshToken.for_user(user)
+                new_refresh_token = issue_refresh_token(user)
 
                 return get_response(
                     is_success=True,
@@ -140,6 +181,16 @@ class UserViewSet(viewsets.GenericViewSet):
                 message="Invalid token.", status_code=status.HTTP_400_BAD_REQUEST
             )
 
+    def get_list_queryset(self):
+        """Filtered ``values()`` rows, rendered by ``user_lite_projection``"""
+        queryset = CustomUser.objects.with_latest_form_id().filter(
+            user_role=UserRoleEnum.USER.value,
+            is_active=True,
+            is_superuser=False,
+        )
+        # Cursor pagination reads created_at from the rows
+        return user_lite_projection.values(self.filter_queryset(queryset), "created_at")
+
     @action(
         detail=False,
         methods=["get"],
@@ -147,14 +198,26 @@ class UserViewSet(viewsets.GenericViewSet):
         url_name="me",
     )
     def user_profile(self, request):
-        serializer = CustomUserLiteSerializer(
-            request.user, context={"request": request}
-        )
-        return get_response(
-            is_success=True,
-            message="User profile fetched successfully.",
-            data=serializer.data,
-        )
+        user = request.user
+        cached, version = get_cached_profile(request)
+        if cached is None:
+            latest_form_id, etag, last_modified = get_profile_validators(user)
+            data = None
+        else:
+            data, etag, last_modified = cached
+        response = check_preconditions(request, etag, last_modified)
+        if response is None:
+            if data is None:
+                user.latest_form_id = latest_form_id
+                serializer = CustomUserLiteSerializer(user, context={"request": request})
+                data = dict(serializer.data)
+                set_cached_profile(request, version, data, etag, last_modified)
+            response = get_response(
+                is_success=True,
+                message="User profile fetched successfully.",
+                data=data,
+            )
+        return set_validators(response, etag, last_modified)
 
     @action(
         detail=False,
@@ -163,6 +226,11 @@ class UserViewSet(viewsets.GenericViewSet):
         url_name="update-profile",
     )
     def update_profile(self, request):
+        _, etag, last_modified = get_profile_validators(request.user)
+        response = check_preconditions(request, etag, last_modified)
+        if response is not None:
+            return response
+
         serializer = CustomUserSerializer(
             request.user,
             data=request.data,
@@ -209,7 +277,7 @@ class UserViewSet(viewsets.GenericViewSet):
 
             first_name = data.get("first_name", "")
             last_name = data.get("last_name", "")
-            password = data.get("password") or "Wedo@123"
+            password = data.get("password") or DEFAULT_PASSWORD
 
             user = CustomUser.objects.create_user(
                 email=email,
@@ -237,35 +305,51 @@ class UserViewSet(viewsets.GenericViewSet):
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
 
-    @action(methods=["get"], detail=False, url_path="users", url_name="users")
+    @action(methods=["post"], detail=False, url_path="bulk-add", url_name="bulk-add")
     @allow_permission([UserRoleEnum.SUPER_ADMIN])
-    def list_user(self, request):
-        queryset = CustomUser.objects.filter(
-            user_role=UserRoleEnum.USER.value,
-            is_active=True,
-            is_superuser=False,
+    def bulk_create_users(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return get_response(
+                is_success=False,
+                message="A CSV or JSONL file is required.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_format = get_file_format(upload.name, request.data.get("format"))
+        if not file_format:
+            return get_response(
+                is_success=False,
+                message="Unsupported file format, use csv or jsonl.",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = read_rows(TextIOWrapper(upload, encoding="utf-8-sig"), file_format)
+        results = summarize_results(provision_users(rows))
+        return StreamingHttpResponse(
+            (json.dumps(result) + "\n" for result in results),
+            content_type="application/x-ndjson",
         )
 
-        queryset = self.filter_queryset(queryset)
+    @action(methods=["get"], detail=False, url_path="users", url_name="users")
+    @allow_permission([UserRoleEnum.SUPER_ADMIN])
+    def list_user(self, request):
+        queryset = self.get_list_queryset()
+        context = {"request": request}
 
         paginator = CustomPagination()
         page = paginator.paginate_queryset(queryset, request)
 
         if page is not None:
-            serializer = CustomUserLiteSerializer(
-                page, many=True, context={"request": request}
-            )
             return paginator.get_paginated_response(
-                serializer.data, message="Users fetched successfully."
+                user_lite_projection.render(page, context),
+                message="Users fetched successfully.",
             )
 
-        serializer = CustomUserLiteSerializer(
-            queryset, many=True, context={"request": request}
-        )
         return get_response(
             is_success=True,
             message="Users fetched successfully.",
-            data=serializer.data,
+            data=user_lite_projection.render(queryset, context),
         )
 
     @action(
@@ -277,7 +361,7 @@ class UserViewSet(viewsets.GenericViewSet):
     @allow_permission([UserRoleEnum.SUPER_ADMIN])
     def retrieve_user(self, request, user_id=None):
         try:
-            user = CustomUser.objects.get(
+            user = CustomUser.objects.with_latest_form_id().get(
                 id=user_id,
                 is_active=True,
             )